@@ -0,0 +1,255 @@
+import hashlib
+import http.server
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+
+# Các đường dẫn feed mà discover_feed thử lần lượt; blog tổng hợp đặt feed ở một trong số đó
+# để các đường dẫn đứng trước trả về 404 và buộc trình thu thập dò tiếp
+FEED_PATHS = ['/atom.xml', '/rss.xml', '/rss2.xml', '/rss.php', '/feed', '/feed.xml', '/feed/', '/index.xml']
+
+
+class SyntheticSite:
+    """
+    Mô tả một blog tổng hợp: vị trí feed, định dạng, nội dung feed đã sinh sẵn và trạng thái lỗi.
+    """
+
+    def __init__(self, index, feed_path, feed_format, body, dead, rss_field):
+        self.index = index
+        self.feed_path = feed_path
+        self.feed_format = feed_format
+        self.body = body
+        self.etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        self.dead = dead
+        self.rss_field = rss_field
+
+
+def _build_feed(index, base_url, feed_format, entries, entry_bytes):
+    """
+    Sinh nội dung feed Atom hoặc RSS2 với số bài viết và dung lượng mỗi bài cho trước, bài mới nhất đứng trước.
+    """
+    now = int(time.time())
+    padding = 'x' * max(0, entry_bytes)
+    items = []
+    for j in range(entries):
+        published = now - (j + 1) * 3600 * (1 + index % 24)
+        link = f"{base_url}/b{index}/posts/{j}"
+        if feed_format == 'atom':
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(published))
+            items.append(
+                f"<entry><title>Post {index}-{j}</title><link href=\"{link}\"/><id>{link}</id>"
+                f"<published>{stamp}</published><updated>{stamp}</updated>"
+                f"<summary>{padding}</summary></entry>"
+            )
+        else:
+            items.append(
+                f"<item><title>Post {index}-{j}</title><link>{link}</link><guid>{link}</guid>"
+                f"<pubDate>{formatdate(published, usegmt=True)}</pubDate>"
+                f"<description>{padding}</description></item>"
+            )
+    if feed_format == 'atom':
+        return (
+            "<?xml version=\"1.0\" encoding=\"utf-8\"?><feed xmlns=\"http://www.w3.org/2005/Atom\">"
+            f"<title>Blog {index}</title><author><name>Author {index}</name></author>"
+            f"<link href=\"{base_url}/b{index}\"/>{''.join(items)}</feed>"
+        ).encode('utf-8')
+    return (
+        "<?xml version=\"1.0\" encoding=\"utf-8\"?><rss version=\"2.0\"><channel>"
+        f"<title>Blog {index}</title><link>{base_url}/b{index}</link>{''.join(items)}</channel></rss>"
+    ).encode('utf-8')
+
+
+class SyntheticFeedServer:
+    """
+    Máy chủ HTTP cục bộ đóng vai các blog bạn bè, dùng cho benchmark không cần mạng.
+
+    Phục vụ /links.json (định dạng cf-links), feed của N blog tổng hợp tại /b{i}/..., cùng
+    /merge/all.json và /merge/errors.json làm nguồn dữ liệu cho các hàm hợp nhất.
+    Đếm số request và số byte đã gửi để báo cáo.
+    """
+
+    def __init__(self, friends=100, entries=20, entry_bytes=500, latency=0.0, jitter=0.0, error_rate=0.0,
+                 dead_ratio=0.05, missing_path_ratio=0.5, rss_field_ratio=0.1, etag=True, seed=0):
+        """
+        Tham số:
+        friends (int): Số blog tổng hợp.
+        entries (int): Số bài viết trong mỗi feed.
+        entry_bytes (int): Dung lượng phần tóm tắt của mỗi bài viết (byte).
+        latency (float): Độ trễ cơ bản (giây) trước khi trả lời mỗi request tới blog.
+        jitter (float): Độ trễ ngẫu nhiên cộng thêm, tối đa (giây).
+        error_rate (float): Xác suất một request tới feed bị trả về 503.
+        dead_ratio (float): Tỷ lệ blog chết (mọi đường dẫn đều trả về 404).
+        missing_path_ratio (float): Tỷ lệ blog đặt feed ở đường dẫn phía sau trong danh sách dò,
+                                    các đường dẫn đứng trước trả về 404.
+        rss_field_ratio (float): Tỷ lệ bạn bè khai báo sẵn trường rss trong links.json.
+        etag (bool): Gửi ETag và trả về 304 cho request có điều kiện.
+        seed (int): Hạt giống ngẫu nhiên để bộ dữ liệu lặp lại được.
+        """
+        self.friends = friends
+        self.entries = entries
+        self.entry_bytes = entry_bytes
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.dead_ratio = dead_ratio
+        self.missing_path_ratio = missing_path_ratio
+        self.rss_field_ratio = rss_field_ratio
+        self.etag = etag
+        self.seed = seed
+        self.sites = []
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._httpd = None
+        self.base_url = None
+
+    def start(self):
+        """
+        Khởi động máy chủ trên một cổng ngẫu nhiên trong thread nền và sinh sẵn toàn bộ dữ liệu.
+        """
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self)
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._build_sites()
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def _build_sites(self):
+        rng = random.Random(self.seed)
+        for i in range(self.friends):
+            if rng.random() < self.missing_path_ratio:
+                feed_path = rng.choice(FEED_PATHS[1:])
+            else:
+                feed_path = FEED_PATHS[0]
+            feed_format = 'atom' if feed_path in ('/atom.xml', '/index.xml') or rng.random() < 0.5 else 'rss'
+            body = _build_feed(i, self.base_url, feed_format, self.entries, self.entry_bytes)
+            self.sites.append(SyntheticSite(
+                index=i,
+                feed_path=feed_path,
+                feed_format=feed_format,
+                body=body,
+                dead=rng.random() < self.dead_ratio,
+                rss_field=rng.random() < self.rss_field_ratio
+            ))
+
+    def links_json(self):
+        link_list = []
+        for site in self.sites:
+            friend = {
+                'name': f'Blog {site.index}',
+                'link': f"{self.base_url}/b{site.index}",
+                'avatar': f"{self.base_url}/b{site.index}/avatar.png"
+            }
+            if site.rss_field:
+                friend['rss'] = f"{self.base_url}/b{site.index}{site.feed_path}"
+            link_list.append(friend)
+        return {'friends': [{'id_name': 'cf-links', 'link_list': link_list}]}
+
+    def merge_all_json(self):
+        """
+        Dữ liệu all.json của một "máy chủ khác" dùng cho marge_data_from_json_url: một nửa số blog,
+        trùng một phần bài viết với dữ liệu thu thập được.
+        """
+        articles = []
+        for site in self.sites[::2]:
+            for j in range(0, self.entries, 2):
+                articles.append({
+                    'title': f'Post {site.index}-{j}',
+                    'created': '2024-01-01 00:00',
+                    'link': f"{self.base_url}/b{site.index}/posts/{j}",
+                    'author': f'Blog {site.index}',
+                    'avatar': ''
+                })
+        return {'statistical_data': {'friends_num': len(self.sites)}, 'article_data': articles}
+
+    def merge_errors_json(self):
+        return [
+            {'name': f'Blog {site.index}', 'link': f"{self.base_url}/b{site.index}", 'avatar': ''}
+            for site in self.sites if site.dead
+        ]
+
+    def _handle(self, handler):
+        path = handler.path.split('?', 1)[0]
+        if path == '/links.json':
+            return self._send(handler, 200, json.dumps(self.links_json()).encode('utf-8'), 'application/json')
+        if path == '/merge/all.json':
+            return self._send_json(handler, self.merge_all_json())
+        if path == '/merge/errors.json':
+            return self._send_json(handler, self.merge_errors_json())
+
+        site, rest = self._site_for(path)
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if site is None or site.dead or rest != site.feed_path:
+            return self._send(handler, 404, b'', 'text/plain')
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._send(handler, 503, b'', 'text/plain')
+        headers = {}
+        if self.etag:
+            headers['ETag'] = site.etag
+            if handler.headers.get('If-None-Match') == site.etag:
+                return self._send(handler, 304, b'', None, headers)
+        ctype = 'application/atom+xml' if site.feed_format == 'atom' else 'application/rss+xml'
+        return self._send(handler, 200, site.body, ctype, headers)
+
+    def _send_json(self, handler, data):
+        """
+        Gửi dữ liệu JSON cho các hàm hợp nhất, có ETag và 304 giống feed khi bật etag.
+        """
+        body = json.dumps(data).encode('utf-8')
+        headers = {}
+        if self.etag:
+            headers['ETag'] = '"' + hashlib.md5(body).hexdigest() + '"'
+            if handler.headers.get('If-None-Match') == headers['ETag']:
+                return self._send(handler, 304, b'', None, headers)
+        return self._send(handler, 200, body, 'application/json', headers)
+
+    def _site_for(self, path):
+        if not path.startswith('/b'):
+            return None, ''
+        head, _, rest = path[2:].partition('/')
+        if not head.isdigit() or int(head) >= len(self.sites):
+            return None, ''
+        return self.sites[int(head)], '/' + rest
+
+    def _send(self, handler, status, body, ctype, headers=None):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+        try:
+            handler.send_response(status)
+            if ctype:
+                handler.send_header('Content-Type', ctype)
+            for key, value in (headers or {}).items():
+                handler.send_header(key, value)
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            if body:
+                handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
@@ -0,0 +1,221 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.feed_server import SyntheticFeedServer
+
+
+def _peak_rss_mb(children=False):
+    """
+    RSS lớn nhất (MB) của tiến trình hiện tại, hoặc của tiến trình con lớn nhất đã kết thúc nếu children=True;
+    None nếu không đo được.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_scenario(base_url, options, queue):
+    """
+    Chạy toàn bộ quy trình trong một tiến trình con (để RSS lớn nhất của từng kịch bản đo riêng):
+    fetch_and_process_data, marge_data_from_json_url, marge_errors_from_json_url và deal_with_large_data.
+    Kết quả từng lần lặp được đưa vào queue, cuối cùng là bản ghi kết thúc chứa RSS lớn nhất của các tiến trình
+    phân tích (chỉ đo được sau khi pool đã đóng).
+    """
+    if not options['verbose']:
+        logging.disable(logging.CRITICAL)
+    from friend_circle_lite.get_info import (
+        fetch_and_process_data,
+        create_parse_pool,
+        marge_data_from_json_url,
+        marge_errors_from_json_url,
+        deal_with_large_data
+    )
+
+    cache_dir = tempfile.mkdtemp(prefix='fcl-bench-') if options['cache'] else None
+    parse_pool = create_parse_pool(options['parse_workers'])
+    for repeat in range(options['repeat']):
+        report = {'repeat': repeat + 1, 'stages': {}, 'failures': {}}
+        start = time.perf_counter()
+
+        stage_start = time.perf_counter()
+        fetched = fetch_and_process_data(
+            json_url=f"{base_url}/links.json",
+            count=options['count'],
+            cache_dir=cache_dir,
+            max_workers=options['workers'],
+            max_per_host=options['max_per_host'],
+            lean=options['lean'],
+            max_bytes=options['max_bytes'],
+            time_budget=options['time_budget'],
+            parse_pool=parse_pool
+        )
+        report['stages']['crawl'] = time.perf_counter() - stage_start
+        if fetched is None:
+            report['failures']['crawl'] = 'links.json unavailable'
+            queue.put(report)
+            continue
+        result, errors = fetched
+
+        stage_start = time.perf_counter()
+        result = marge_data_from_json_url(result, f"{base_url}/merge/all.json")
+        errors = marge_errors_from_json_url(errors, f"{base_url}/merge/errors.json")
+        report['stages']['merge'] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        result = deal_with_large_data(result)
+        report['stages']['post'] = time.perf_counter() - stage_start
+
+        report['wall'] = time.perf_counter() - start
+        report['active'] = result['statistical_data'].get('active_num')
+        report['errors'] = len(errors)
+        report['articles'] = len(result.get('article_data', []))
+        report['peak_rss_mb'] = _peak_rss_mb()
+        queue.put(report)
+    parse_peak = None
+    if parse_pool is not None:
+        parse_pool.shutdown()
+        parse_peak = _peak_rss_mb(children=True)
+    queue.put({'done': True, 'parse_peak_rss_mb': parse_peak})
+
+
+def run_benchmark(server, options):
+    """
+    Chạy một kịch bản (một số thread thu thập) trên máy chủ tổng hợp, trả về danh sách báo cáo của từng lần lặp,
+    có thêm số request và số byte mà máy chủ đã phục vụ.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    server.reset_counters()
+    process = context.Process(target=_run_scenario, args=(server.base_url, options, queue))
+    process.start()
+
+    reports = []
+    served_requests = served_bytes = 0
+    while True:
+        report = queue.get()
+        if report.get('done'):
+            for finished in reports:
+                finished['parse_peak_rss_mb'] = report['parse_peak_rss_mb']
+            break
+        # Bộ đếm của máy chủ là luỹ kế trong kịch bản, lấy hiệu số cho từng lần lặp
+        report['requests'] = server.requests - served_requests
+        report['bytes'] = server.bytes_sent - served_bytes
+        served_requests, served_bytes = server.requests, server.bytes_sent
+        report['workers'] = options['workers']
+        reports.append(report)
+    process.join()
+    return reports
+
+
+def format_report(reports):
+    lines = [
+        f"{'workers':<8}{'run':>4}{'wall(s)':>9}{'crawl':>8}{'merge':>8}{'post':>8}"
+        f"{'requests':>10}{'MB':>9}{'main(MB)':>9}{'parse':>8}{'active':>8}{'errors':>8}{'articles':>10}"
+    ]
+    for report in reports:
+        stages = report['stages']
+        rss = report.get('peak_rss_mb')
+        parse_rss = report.get('parse_peak_rss_mb')
+        lines.append(
+            f"{report['workers']:<8}{report['repeat']:>4}{report.get('wall', 0):>9.2f}"
+            f"{stages.get('crawl', 0):>8.2f}{stages.get('merge', 0):>8.2f}{stages.get('post', 0):>8.2f}"
+            f"{report['requests']:>10}{report['bytes'] / 1048576:>9.2f}"
+            f"{rss if rss is not None else float('nan'):>9.1f}"
+            f"{parse_rss if parse_rss is not None else float('nan'):>8.1f}"
+            f"{report.get('active') or 0:>8}{report.get('errors', 0):>8}{report.get('articles', 0):>10}"
+        )
+        for stage, failure in report['failures'].items():
+            lines.append(f"    ! {stage}: {failure}")
+    return '\n'.join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark trình thu thập Friend Circle Lite với máy chủ feed tổng hợp cục bộ"
+    )
+    arg_parser.add_argument('--friends', type=int, default=200, help="Số blog tổng hợp")
+    arg_parser.add_argument('--entries', type=int, default=20, help="Số bài viết trong mỗi feed")
+    arg_parser.add_argument('--entry-bytes', type=int, default=500, help="Dung lượng tóm tắt mỗi bài viết (byte)")
+    arg_parser.add_argument('--latency', type=float, default=0.05, help="Độ trễ mỗi request tới blog (giây)")
+    arg_parser.add_argument('--jitter', type=float, default=0.05, help="Độ trễ ngẫu nhiên cộng thêm tối đa (giây)")
+    arg_parser.add_argument('--error-rate', type=float, default=0.02, help="Xác suất request feed trả về 503")
+    arg_parser.add_argument('--dead-ratio', type=float, default=0.05, help="Tỷ lệ blog chết")
+    arg_parser.add_argument('--missing-path-ratio', type=float, default=0.5,
+                            help="Tỷ lệ blog đặt feed ở đường dẫn phía sau trong danh sách dò")
+    arg_parser.add_argument('--rss-field-ratio', type=float, default=0.1,
+                            help="Tỷ lệ bạn bè khai báo sẵn trường rss")
+    arg_parser.add_argument('--no-etag', action='store_true', help="Máy chủ không gửi ETag")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--workers', default='10',
+                            help="Số thread thu thập, có thể liệt kê nhiều giá trị cách nhau bởi dấu phẩy để so sánh")
+    arg_parser.add_argument('--max-per-host', type=int, default=1000,
+                            help="Giới hạn theo host; mọi blog tổng hợp cùng một host nên mặc định không giới hạn")
+    arg_parser.add_argument('--count', type=int, default=15, help="Số bài viết lấy từ mỗi blog")
+    arg_parser.add_argument('--lean', action='store_true', help="Phân tích feed ở chế độ gọn nhẹ")
+    arg_parser.add_argument('--parse-workers', type=int, default=1,
+                            help="Số tiến trình phân tích feed, 1 là phân tích ngay trong thread tải, 0 là số lõi CPU")
+    arg_parser.add_argument('--max-bytes', type=int, default=None)
+    arg_parser.add_argument('--time-budget', type=float, default=None)
+    arg_parser.add_argument('--cache', action='store_true',
+                            help="Bật cache feed; từ lần lặp thứ hai trở đi là chạy với cache đã ấm")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="Số lần lặp mỗi kịch bản")
+    arg_parser.add_argument('--json', dest='json_path', help="Ghi báo cáo dạng JSON vào file này")
+    arg_parser.add_argument('--verbose', action='store_true', help="Hiện log của trình thu thập")
+    args = arg_parser.parse_args()
+
+    server = SyntheticFeedServer(
+        friends=args.friends,
+        entries=args.entries,
+        entry_bytes=args.entry_bytes,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        dead_ratio=args.dead_ratio,
+        missing_path_ratio=args.missing_path_ratio,
+        rss_field_ratio=args.rss_field_ratio,
+        etag=not args.no_etag,
+        seed=args.seed
+    ).start()
+
+    reports = []
+    try:
+        for workers in [int(value) for value in args.workers.split(',') if value.strip()]:
+            options = {
+                'workers': workers,
+                'max_per_host': args.max_per_host,
+                'count': args.count,
+                'lean': args.lean,
+                'max_bytes': args.max_bytes,
+                'parse_workers': args.parse_workers,
+                'time_budget': args.time_budget,
+                'cache': args.cache,
+                'repeat': args.repeat,
+                'verbose': args.verbose
+            }
+            reports.extend(run_benchmark(server, options))
+    finally:
+        server.stop()
+
+    print(format_report(reports))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'reports': reports}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
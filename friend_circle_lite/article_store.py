@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from friend_circle_lite.get_info import article_timestamp, format_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    link TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    avatar TEXT NOT NULL DEFAULT '',
+    timestamp INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_articles_timestamp ON articles (timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_author ON articles (author, timestamp DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class ArticleStore:
+    """
+    Kho bài viết SQLite, khóa theo liên kết bài viết, có chỉ mục theo thời gian xuất bản và tác giả.
+
+    Trình thu thập ghi vào kho sau mỗi lần chạy và giữ toàn bộ lịch sử; all.json chỉ là bản xuất từ kho.
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        Tham số:
+        path (str): Đường dẫn file cơ sở dữ liệu.
+        readonly (bool): Mở ở chế độ chỉ đọc (dùng cho server.py), file phải tồn tại sẵn.
+        """
+        self.path = path
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self.conn.executescript(SCHEMA)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert_articles(self, articles):
+        """
+        Thêm mới hoặc cập nhật bài viết theo liên kết.
+
+        Tham số:
+        articles (list): Danh sách bài viết dạng article_data.
+
+        Trả về:
+        int: Số bài viết đã ghi.
+        """
+        now = int(time.time())
+        rows = [
+            (
+                article['link'],
+                article.get('title', ''),
+                article.get('author', ''),
+                article.get('avatar', ''),
+                article_timestamp(article),
+                now
+            )
+            for article in articles if article.get('link')
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO articles (link, title, author, avatar, timestamp, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (link) DO UPDATE SET
+                    title = excluded.title,
+                    author = excluded.author,
+                    avatar = excluded.avatar,
+                    timestamp = excluded.timestamp,
+                    updated_at = excluded.updated_at
+                """,
+                rows
+            )
+        return len(rows)
+
+    def set_meta(self, key, value):
+        """
+        Lưu một giá trị bất kỳ (được tuần tự hóa JSON) vào bảng meta, ví dụ statistical_data.
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def query_articles(self, limit=None, offset=0, author=None, since=None):
+        """
+        Truy vấn bài viết mới nhất trước, dùng chỉ mục theo thời gian hoặc theo tác giả.
+
+        Tham số:
+        limit (int): Số bài viết tối đa, None là không giới hạn.
+        offset (int): Bỏ qua bao nhiêu bài viết đầu tiên.
+        author (str): Chỉ lấy bài viết của tác giả này.
+        since (int): Chỉ lấy bài viết có epoch không nhỏ hơn giá trị này.
+
+        Trả về:
+        list: Danh sách bài viết dạng article_data (kèm timestamp).
+        """
+        sql, params = self._where(author, since)
+        sql = "SELECT link, title, author, avatar, timestamp FROM articles" + sql
+        sql += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        return [self._to_article(row) for row in self.conn.execute(sql, params)]
+
+    def count_articles(self, author=None, since=None):
+        sql, params = self._where(author, since)
+        return self.conn.execute("SELECT COUNT(*) FROM articles" + sql, params).fetchone()[0]
+
+    def author_summaries(self):
+        """
+        Thống kê theo tác giả: số bài viết, bài viết mới nhất, sắp xếp theo thời gian cập nhật gần nhất.
+
+        Trả về:
+        list: [{author, avatar, article_num, latest_title, latest_link, latest_created}]
+        """
+        rows = self.conn.execute(
+            """
+            SELECT a.author, a.avatar, a.title, a.link, a.timestamp, s.article_num
+            FROM (SELECT author, MAX(timestamp) AS latest, COUNT(*) AS article_num
+                  FROM articles GROUP BY author) AS s
+            JOIN articles AS a ON a.author = s.author AND a.timestamp = s.latest
+            GROUP BY a.author
+            ORDER BY a.timestamp DESC
+            """
+        )
+        return [
+            {
+                'author': row['author'],
+                'avatar': row['avatar'],
+                'article_num': row['article_num'],
+                'latest_title': row['title'],
+                'latest_link': row['link'],
+                'latest_created': format_timestamp(row['timestamp']) if row['timestamp'] else ''
+            }
+            for row in rows
+        ]
+
+    def random_article(self):
+        """
+        Lấy ngẫu nhiên một bài viết, None nếu kho rỗng.
+        """
+        row = self.conn.execute(
+            "SELECT link, title, author, avatar, timestamp FROM articles "
+            "WHERE rowid >= (abs(random()) % (SELECT max(rowid) FROM articles) + 1) LIMIT 1"
+        ).fetchone()
+        return self._to_article(row) if row else None
+
+    def export(self):
+        """
+        Xuất toàn bộ kho thành cấu trúc giống all.json (statistical_data lấy từ bảng meta).
+        """
+        articles = self.query_articles()
+        statistical_data = dict(self.get_meta('statistical_data', {}))
+        statistical_data['article_num'] = len(articles)
+        return {
+            'statistical_data': statistical_data,
+            'article_data': articles
+        }
+
+    @staticmethod
+    def _where(author, since):
+        clauses, params = [], []
+        if author is not None:
+            clauses.append("author = ?")
+            params.append(author)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @staticmethod
+    def _to_article(row):
+        return {
+            'title': row['title'],
+            'created': format_timestamp(row['timestamp']) if row['timestamp'] else '',
+            'link': row['link'],
+            'author': row['author'],
+            'avatar': row['avatar'],
+            'timestamp': row['timestamp']
+        }
+
+
+def store_crawl_result(path, result):
+    """
+    Ghi kết quả thu thập vào kho bài viết rồi xuất lại toàn bộ lịch sử dưới dạng result của all.json.
+
+    Tham số:
+    path (str): Đường dẫn file cơ sở dữ liệu.
+    result (dict): Kết quả của fetch_and_process_data (có thể đã hợp nhất).
+
+    Trả về:
+    dict: Dữ liệu xuất từ kho, gồm cả bài viết của các lần chạy trước.
+    """
+    with ArticleStore(path) as store:
+        written = store.upsert_articles(result.get('article_data', []))
+        store.set_meta('statistical_data', result.get('statistical_data', {}))
+        exported = store.export()
+    logging.info(f"Đã ghi {written} bài viết vào kho {path}, kho hiện có {len(exported['article_data'])} bài viết")
+    return exported
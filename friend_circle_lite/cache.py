@@ -0,0 +1,290 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def load_json_file(path):
+    """
+    Đọc file JSON dạng từ điển, trả về từ điển rỗng nếu file không tồn tại hoặc bị hỏng.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Không thể đọc file cache {path}, bỏ qua: {e}")
+        return {}
+
+def dump_json_file(path, data):
+    """
+    Ghi file JSON gọn (ghi vào file tạm rồi đổi tên để tránh hỏng file), lỗi chỉ được ghi log.
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error(f"Không thể ghi file cache {path}: {e}")
+
+
+def _without_content(result):
+    """
+    Bản sao kết quả parse_feed không có nội dung đầy đủ (content) của bài viết, phần lớn dung lượng của feed toàn văn.
+    """
+    if not isinstance(result, dict) or not isinstance(result.get('articles'), list):
+        return copy.deepcopy(result)
+    articles = [
+        {key: value for key, value in article.items() if key != 'content'}
+        for article in result['articles']
+    ]
+    return dict(copy.deepcopy({key: value for key, value in result.items() if key != 'articles'}), articles=articles)
+
+
+class FeedCache:
+    """
+    Bộ nhớ đệm bền vững cho các feed, lưu dưới dạng file JSON trong thư mục cache.
+
+    Với mỗi địa chỉ feed, lưu lại ETag / Last-Modified do máy chủ trả về cùng với kết quả
+    đã phân tích, để lần chạy sau có thể gửi request có điều kiện và dùng lại kết quả khi nhận 304.
+    Kèm theo là băm nội dung feed: máy chủ không gửi validator vẫn trả về đúng nội dung cũ thì
+    kết quả đã phân tích được dùng lại mà không phải phân tích lại.
+    Với mỗi blog, lưu lại địa chỉ feed đã dò được để lần sau thử trước, tránh dò lại toàn bộ.
+
+    Kết quả được lưu không có content của bài viết. Khi lưu xuống đĩa, các mục không được dùng tới trong lần chạy này
+    (và không thuộc bạn bè hiện tại, xem save) bị loại bỏ, nên mỗi nơi dùng cache (thu thập, hợp nhất, rss_subscribe)
+    có file riêng theo namespace để không xóa mục của nhau.
+    """
+
+    def __init__(self, cache_dir, discovery_ttl=72, namespace=None):
+        """
+        Tham số:
+        cache_dir (str): Thư mục lưu file cache, sẽ được tạo nếu chưa tồn tại.
+        discovery_ttl (float): Thời gian hiệu lực (giờ) của kết quả dò feed.
+        namespace (str): Tiền tố tên file cache, None là file của trình thu thập.
+        """
+        prefix = f'{namespace}_' if namespace else ''
+        self.cache_dir = cache_dir
+        self.discovery_ttl = discovery_ttl * 3600
+        self.feeds_path = os.path.join(cache_dir, f'{prefix}feed_cache.json')
+        self.discovery_path = os.path.join(cache_dir, f'{prefix}discovery_cache.json')
+        self._lock = threading.Lock()
+        self._feeds = load_json_file(self.feeds_path)
+        self._discovery = load_json_file(self.discovery_path)
+        self._used_feeds = set()
+        self._used_blogs = set()
+
+    def conditional_headers(self, url, signature):
+        """
+        Tạo header request có điều kiện (If-None-Match / If-Modified-Since) cho feed.
+
+        Chỉ trả về header khi đã có kết quả được lưu với cùng signature, nếu không máy chủ
+        có thể trả về 304 mà ta lại không có gì để dùng lại.
+
+        Tham số:
+        url (str): Địa chỉ feed.
+        signature (str): Chuỗi mô tả tham số phân tích (số bài viết, blog_url...).
+
+        Trả về:
+        dict: Header cần thêm vào request, có thể rỗng.
+        """
+        with self._lock:
+            self._used_feeds.add(url)
+            entry = self._feeds.get(url)
+        if not entry or entry.get('signature') != signature:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def cached_result(self, url, signature):
+        """
+        Lấy kết quả phân tích đã lưu của feed.
+
+        Trả về:
+        dict | None: Bản sao kết quả đã lưu, None nếu không có hoặc signature không khớp.
+        """
+        with self._lock:
+            self._used_feeds.add(url)
+            entry = self._feeds.get(url)
+            if not entry or entry.get('signature') != signature:
+                return None
+            return copy.deepcopy(entry['result'])
+
+    def result_for_body(self, url, signature, content_hash):
+        """
+        Lấy kết quả phân tích đã lưu nếu nội dung feed giống hệt lần trước (cùng băm nội dung và signature).
+
+        Trả về:
+        dict | None: Bản sao kết quả đã lưu, None nếu nội dung đã thay đổi hoặc chưa có.
+        """
+        with self._lock:
+            self._used_feeds.add(url)
+            entry = self._feeds.get(url)
+            if not entry or entry.get('signature') != signature or entry.get('content_hash') != content_hash:
+                return None
+            return copy.deepcopy(entry['result'])
+
+    def store(self, url, response, result, signature, content_hash=None):
+        """
+        Lưu validator của response, băm nội dung và kết quả phân tích tương ứng (không kèm content của bài viết).
+
+        Feed không có ETag, Last-Modified lẫn băm nội dung sẽ không được lưu vì không có cách nào dùng lại.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            self._used_feeds.add(url)
+            if not etag and not last_modified and not content_hash:
+                self._feeds.pop(url, None)
+                return
+            self._feeds[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': content_hash,
+                'signature': signature,
+                'result': _without_content(result)
+            }
+
+    def discovered_feed(self, blog_url):
+        """
+        Lấy địa chỉ feed đã dò được của blog nếu vẫn còn hiệu lực.
+
+        Tham số:
+        blog_url (str): Địa chỉ blog (trường link của bạn bè).
+
+        Trả về:
+        list | None: [feed_type, feed_url], None nếu chưa có hoặc đã hết hạn.
+        """
+        with self._lock:
+            self._used_blogs.add(blog_url)
+            entry = self._discovery.get(blog_url)
+        if not entry or time.time() - entry.get('checked_at', 0) > self.discovery_ttl:
+            return None
+        return [entry['feed_type'], entry['feed_url']]
+
+    def store_discovery(self, blog_url, feed_type, feed_url):
+        """
+        Ghi nhận địa chỉ feed dò được của blog, tính lại thời gian hết hạn từ bây giờ.
+        """
+        with self._lock:
+            self._used_blogs.add(blog_url)
+            self._discovery[blog_url] = {
+                'feed_type': feed_type,
+                'feed_url': feed_url,
+                'checked_at': time.time()
+            }
+
+    def forget_discovery(self, blog_url):
+        """
+        Xóa kết quả dò feed của blog, dùng khi địa chỉ đã lưu không còn truy cập được.
+        """
+        with self._lock:
+            self._discovery.pop(blog_url, None)
+
+    def save(self, friends=None, keep_urls=()):
+        """
+        Ghi cache xuống đĩa (ghi vào file tạm rồi đổi tên để tránh hỏng file), bỏ các mục không dùng tới
+        trong lần chạy này để file không phình ra theo các bạn bè hay địa chỉ feed cũ.
+
+        Tham số:
+        friends (list): Danh sách bạn bè hiện tại; kết quả dò feed và feed của họ được giữ lại kể cả khi
+                        không được thu thập trong lần này (chế độ tăng dần, bạn bè bị cách ly).
+        keep_urls (iterable): Các địa chỉ feed khác cần giữ lại (như nguồn RSS cụ thể).
+        """
+        with self._lock:
+            blogs = set(self._used_blogs)
+            feeds = set(self._used_feeds) | set(keep_urls)
+            for friend in friends or ():
+                if friend.get('rss'):
+                    feeds.add(friend['rss'])
+                else:
+                    blogs.add(friend.get('link', ''))
+            self._discovery = {blog: entry for blog, entry in self._discovery.items() if blog in blogs}
+            feeds.update(entry.get('feed_url') for entry in self._discovery.values())
+            self._feeds = {url: entry for url, entry in self._feeds.items() if url in feeds}
+            files = [
+                (self.feeds_path, copy.deepcopy(self._feeds)),
+                (self.discovery_path, copy.deepcopy(self._discovery))
+            ]
+        for path, data in files:
+            dump_json_file(path, data)
+
+
+def normalize_blog_url(url):
+    """
+    Chuẩn hóa địa chỉ blog để so khớp: bỏ giao thức, chữ thường phần host, bỏ dấu gạch chéo ở cuối.
+    """
+    parsed = urlparse((url or '').strip())
+    return parsed.netloc.lower() + parsed.path.rstrip('/')
+
+
+class FeedRegistry:
+    """
+    Bộ nhớ đệm trong tiến trình cho kết quả feed của lần thu thập gần nhất, khóa theo địa chỉ blog đã chuẩn hóa.
+
+    Trình thu thập ghi vào sau mỗi feed phân tích thành công; các bước chạy sau trong cùng tiến trình
+    (như rss_subscribe) đọc lại thay vì tải và phân tích feed thêm lần nữa. Nội dung đầy đủ (content)
+    của bài viết không được giữ để bộ nhớ không phình ra ở chế độ daemon.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds = {}
+
+    def register(self, blog_url, feed_url, result, count, lean=False):
+        """
+        Ghi nhận kết quả parse_feed của blog.
+
+        Tham số:
+        blog_url (str): Địa chỉ blog (trường link của bạn bè).
+        feed_url (str): Địa chỉ feed đã phân tích.
+        result (dict): Kết quả parse_feed.
+        count (int): Số bài viết tối đa đã yêu cầu khi phân tích.
+        lean (bool): Kết quả có được phân tích ở chế độ gọn nhẹ không (không có summary).
+        """
+        entry = {
+            'feed_url': feed_url,
+            'result': _without_content(result),
+            'count': count,
+            'lean': lean,
+            'fetched_at': time.time()
+        }
+        with self._lock:
+            self._feeds[normalize_blog_url(blog_url)] = entry
+
+    def lookup(self, blog_url, count=0, need_summary=False):
+        """
+        Lấy kết quả feed của blog trong lần thu thập này.
+
+        Tham số:
+        blog_url (str): Địa chỉ blog.
+        count (int): Số bài viết cần có; kết quả phân tích với count nhỏ hơn không được dùng.
+        need_summary (bool): Cần trường summary, khi đó kết quả phân tích ở chế độ gọn nhẹ không được dùng.
+
+        Trả về:
+        dict | None: {'feed_url', 'result', 'count', 'lean', 'fetched_at'} (bản sao), None nếu không dùng được.
+        """
+        with self._lock:
+            entry = self._feeds.get(normalize_blog_url(blog_url))
+            if entry is None or entry['count'] < count or (need_summary and entry['lean']):
+                return None
+            return copy.deepcopy(entry)
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+
+
+# Bộ nhớ đệm dùng chung cho toàn bộ tiến trình
+feed_registry = FeedRegistry()
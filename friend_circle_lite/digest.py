@@ -0,0 +1,93 @@
+import hashlib
+import time
+
+from friend_circle_lite.cache import load_json_file, dump_json_file
+from friend_circle_lite.get_info import article_timestamp
+
+
+def link_hash(link):
+    """
+    Băm ngắn (16 ký tự hex) của liên kết bài viết, dùng làm khóa trong chỉ mục bản tin.
+    """
+    return hashlib.sha1(link.encode('utf-8')).hexdigest()[:16]
+
+
+class DigestIndex:
+    """
+    Chỉ mục các bài viết đã gửi trong bản tin email hằng ngày, lưu trong file JSON:
+    {'last_digest': epoch lần gửi gần nhất, 'links': {băm liên kết: epoch bài viết}}.
+
+    Bài viết mới là bài viết có epoch trong cửa sổ [last_digest - lookback, hiện tại] mà băm liên kết chưa có
+    trong chỉ mục. Bài viết cũ hơn cửa sổ không bao giờ được gửi nên băm của chúng bị loại khỏi chỉ mục,
+    vì vậy kích thước chỉ mục và chi phí tính phần chênh lệch chỉ phụ thuộc vào số bài viết trong cửa sổ,
+    không phụ thuộc vào tổng lịch sử bài viết.
+    """
+
+    def __init__(self, path, lookback_days=7):
+        """
+        Tham số:
+        path (str): Đường dẫn file chỉ mục.
+        lookback_days (float): Số ngày nhìn lại trước lần gửi gần nhất (lần đầu: trước hiện tại),
+                               để bắt các bài viết được thu thập muộn.
+        """
+        self.path = path
+        self.lookback = lookback_days * 86400
+        data = load_json_file(path)
+        self.last_digest = data.get('last_digest')
+        self._links = data.get('links', {})
+
+    def since(self, now=None):
+        """
+        Epoch nhỏ nhất của bài viết có thể vào bản tin lần này.
+        """
+        start = self.last_digest
+        if start is None:
+            start = time.time() if now is None else now
+        return int(start - self.lookback)
+
+    def is_due(self, interval, now=None):
+        """
+        Đã đến lúc gửi bản tin chưa (cách lần gửi gần nhất ít nhất interval giờ).
+        """
+        now = time.time() if now is None else now
+        return self.last_digest is None or now - self.last_digest >= interval * 3600
+
+    def new_articles(self, articles, now=None):
+        """
+        Lọc ra các bài viết chưa gửi trong cửa sổ hiện tại, mới nhất trước, mỗi liên kết một lần.
+
+        Tham số:
+        articles (iterable): Bài viết dạng article_data.
+
+        Trả về:
+        list: Bài viết mới (kèm trường timestamp).
+        """
+        since = self.since(now)
+        fresh = {}
+        for article in articles:
+            link = article.get('link')
+            if not link:
+                continue
+            timestamp = article_timestamp(article)
+            if timestamp < since:
+                continue
+            key = link_hash(link)
+            if key in self._links or key in fresh:
+                continue
+            fresh[key] = dict(article, timestamp=timestamp)
+        return sorted(fresh.values(), key=lambda article: article['timestamp'], reverse=True)
+
+    def mark_sent(self, articles, now=None):
+        """
+        Ghi nhận các bài viết đã gửi và thời điểm gửi, loại các băm đã ra khỏi cửa sổ rồi lưu chỉ mục.
+        """
+        now = time.time() if now is None else now
+        for article in articles:
+            self._links[link_hash(article['link'])] = article_timestamp(article)
+        self.last_digest = int(now)
+        since = self.since(now)
+        self._links = {key: timestamp for key, timestamp in self._links.items() if timestamp >= since}
+        dump_json_file(self.path, {'last_digest': self.last_digest, 'links': self._links})
+
+    def __len__(self):
+        return len(self._links)
@@ -1,12 +1,28 @@
+import hashlib
+import heapq
 import logging
 from datetime import datetime, timedelta, timezone
 import re
+import time
 from urllib.parse import urljoin, urlparse
 from dateutil import parser
 from zoneinfo import ZoneInfo
+from functools import lru_cache, partial
+from itertools import chain, repeat
+import calendar
+from collections import Counter, defaultdict, deque
 import requests
+from requests.compat import chardet
 import feedparser
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from concurrent.futures import wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+
+from friend_circle_lite.cache import FeedCache, feed_registry, normalize_blog_url
+from friend_circle_lite.incremental import CrawlState, select_friends_to_crawl
+from friend_circle_lite.telemetry import TimedHTTPAdapter, new_friend_stats, pop_connect_time
 
 # Tiêu đề request chuẩn hóa
 HEADERS_JSON = {
@@ -35,6 +51,28 @@ HEADERS_XML = {
 
 timeout = (10, 15) # Thời gian chờ kết nối và đọc, ngăn requests nhận quá lâu
 
+class CrawlDeadlineExceeded(Exception):
+    """
+    Đã hết thời gian cho phép của cả lần thu thập (time_budget của fetch_and_process_data).
+    """
+
+def _bounded_timeout(request_timeout, deadline=None):
+    """
+    Rút ngắn thời gian chờ của một request cho vừa với thời gian còn lại trước deadline (time.monotonic()).
+    Ném CrawlDeadlineExceeded nếu đã hết thời gian.
+    """
+    if deadline is None:
+        return request_timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise CrawlDeadlineExceeded()
+    connect, read = request_timeout if isinstance(request_timeout, tuple) else (request_timeout, request_timeout)
+    return (min(connect, remaining), min(read, remaining))
+
+# Múi giờ hiển thị thời gian bài viết (UTC+8) và định dạng chuỗi thời gian trong all.json
+DISPLAY_TZ = timezone(timedelta(hours=8))
+DISPLAY_FORMAT = '%Y-%m-%d %H:%M'
+
 def format_published_time(time_str):
     """
     Định dạng thời gian xuất bản thành định dạng thống nhất YYYY-MM-DD HH:MM
@@ -45,10 +83,24 @@ def format_published_time(time_str):
     Trả về:
     str: Chuỗi thời gian đã định dạng, trả về chuỗi rỗng nếu phân tích thất bại.
     """
+    return format_timestamp(parse_timestamp(time_str))
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(time_str):
+    """
+    Phân tích chuỗi thời gian với nhiều định dạng thành epoch (giây, UTC). Kết quả được ghi nhớ
+    vì cùng một chuỗi thời gian thường lặp lại giữa các feed và các lần hợp nhất dữ liệu.
+
+    Tham số:
+    time_str (str): Chuỗi thời gian đầu vào, có thể là nhiều định dạng.
+
+    Trả về:
+    int | None: Epoch, None nếu phân tích thất bại.
+    """
     # Thử phân tích tự động chuỗi thời gian đầu vào
     try:
         parsed_time = parser.parse(time_str, fuzzy=True)
-    except (ValueError, parser.ParserError):
+    except (ValueError, OverflowError, parser.ParserError):
         # Định nghĩa các định dạng thời gian được hỗ trợ
         time_formats = [
             '%a, %d %b %Y %H:%M:%S %z',  # Mon, 11 Mar 2024 14:08:32 +0000
@@ -66,27 +118,78 @@ def format_published_time(time_str):
                 continue
         else:
             logging.warning(f"Không thể phân tích chuỗi thời gian: {time_str}")
-            return ''
+            return None
 
     # Xử lý chuyển đổi múi giờ
     if parsed_time.tzinfo is None:
         parsed_time = parsed_time.replace(tzinfo=timezone.utc)
-    shanghai_time = parsed_time.astimezone(timezone(timedelta(hours=8)))
-    return shanghai_time.strftime('%Y-%m-%d %H:%M')
+    return int(parsed_time.timestamp())
+
+@lru_cache(maxsize=4096)
+def format_timestamp(timestamp):
+    """
+    Định dạng epoch thành chuỗi hiển thị YYYY-MM-DD HH:MM theo giờ UTC+8, chuỗi rỗng nếu timestamp là None.
+    """
+    if timestamp is None:
+        return ''
+    return datetime.fromtimestamp(timestamp, DISPLAY_TZ).strftime(DISPLAY_FORMAT)
+
+@lru_cache(maxsize=8192)
+def created_timestamp(created):
+    """
+    Chuyển chuỗi hiển thị YYYY-MM-DD HH:MM (UTC+8) trong all.json ngược lại thành epoch,
+    dùng cho dữ liệu đọc từ file hoặc hợp nhất từ nơi khác chưa có trường timestamp.
+
+    Trả về:
+    int | None: Epoch, None nếu chuỗi rỗng hoặc sai định dạng.
+    """
+    try:
+        return int(datetime.strptime(created, DISPLAY_FORMAT).replace(tzinfo=DISPLAY_TZ).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def article_timestamp(article):
+    """
+    Lấy epoch của bài viết, dùng làm khóa khi sắp xếp và hợp nhất.
+    Ưu tiên trường timestamp, nếu không có thì suy ra từ created hoặc published.
+
+    Trả về:
+    int: Epoch, 0 nếu bài viết không có thông tin thời gian (xếp cuối cùng).
+    """
+    timestamp = article.get('timestamp')
+    if timestamp is None:
+        timestamp = created_timestamp(article.get('created') or article.get('published') or '')
+    return timestamp if timestamp is not None else 0
+
+def strip_internal_fields(result):
+    """
+    Bỏ các trường nội bộ (timestamp) khỏi bài viết trước khi xuất ra all.json, giữ nguyên định dạng file.
+
+    Trả về:
+    dict: Bản sao nông của result với article_data đã được làm gọn.
+    """
+    exported = dict(result)
+    exported['article_data'] = [
+        {key: value for key, value in article.items() if key != 'timestamp'}
+        for article in result.get('article_data', [])
+    ]
+    return exported
 
 
 
-def check_feed(friend, session):
+def check_feed(friend, session, cache=None):
     """
     Kiểm tra liên kết RSS hoặc Atom subscription của blog.
 
     Hàm này nhận một blog, thử nối '/atom.xml', '/rss2.xml' và '/feed' sau khi trích xuất, 
     và kiểm tra xem các liên kết này có thể truy cập được không.
     Ưu tiên Atom, nếu không thể truy cập được, trả về ['none', địa chỉ nguồn].
+    Nếu có cache, địa chỉ đã dò được lần trước (còn hiệu lực) sẽ được thử trước tiên.
 
     Tham số:
     friend (dict): Từ điển chứa thông tin bạn bè.
     session (requests.Session): Đối tượng session dùng cho request.
+    cache (FeedCache): Bộ nhớ đệm lưu kết quả dò feed, có thể là None.
 
     Trả về:
     list: Danh sách chứa loại và liên kết đã nối. Nếu liên kết atom có thể truy cập, trả về ['atom', atom_url];
@@ -94,6 +197,36 @@ def check_feed(friend, session):
             Nếu liên kết feed có thể truy cập, trả về ['feed', feed_url];
             Nếu không thể truy cập, trả về ['none', blog_url].
     """
+    feed_type, feed_url, response = discover_feed(friend, session, cache)
+    if response is not None:
+        response.close()
+    return [feed_type, feed_url]
+
+def discover_feed(friend, session, cache=None, signature=None, request_timeout=timeout, errors=None, deadline=None,
+                  stats=None):
+    """
+    Dò địa chỉ feed của blog giống check_feed, nhưng trả về luôn response của lần dò thành công
+    (chưa đọc nội dung) để parse_feed dùng lại, tránh tải feed hai lần.
+
+    Nếu bạn bè có cấu hình trường rss thì chỉ thử đúng địa chỉ đó.
+
+    Tham số:
+    friend (dict): Từ điển chứa thông tin bạn bè.
+    session (requests.Session): Đối tượng session dùng cho request.
+    cache (FeedCache): Bộ nhớ đệm lưu kết quả dò feed, có thể là None.
+    signature (str): Signature phân tích của parse_feed; nếu có, lần dò sẽ gửi kèm header có điều kiện
+                     và có thể nhận về 304.
+    request_timeout (tuple): Thời gian chờ kết nối và đọc của mỗi lần dò.
+    errors (list): Nếu có, nguyên nhân thất bại của từng lần dò được thêm vào danh sách này.
+    deadline (float): Mốc time.monotonic() phải kết thúc; thời gian chờ của mỗi lần dò được rút ngắn theo
+                      thời gian còn lại, hết giờ thì ném CrawlDeadlineExceeded.
+    stats (dict): Bản ghi số liệu của bạn bè (xem telemetry.new_friend_stats), được cập nhật sau mỗi lần dò.
+
+    Nếu không kết nối được tới máy chủ thì dừng ngay, không thử các địa chỉ còn lại trên cùng host.
+
+    Trả về:
+    list: [feed_type, feed_url, response], response là None nếu không tìm thấy feed.
+    """
     blog_url = friend.get("link", "")
     rsslink = friend.get("rss", "")
     
@@ -107,19 +240,88 @@ def check_feed(friend, session):
         ('feed3', '/feed/'),
         ('index', '/index.xml') # 2024-07-25 Thêm hỗ trợ nội dung /index.xml
     ]
+    feed_urls = [rsslink] if rsslink else [blog_url + path for _, path in possible_feeds]
 
-    for feed_type, path in possible_feeds:
-        feed_url = rsslink if rsslink else blog_url + path
-        try:
-            response = session.get(feed_url, headers=HEADERS_XML, timeout=timeout)
-            if response.status_code == 200:
-                return [feed_url.split('/')[-1].split('.')[0], feed_url]
-        except requests.RequestException:
-            continue
+    errors = [] if errors is None else errors
+    # Bạn bè tự khai báo rss thì luôn dùng đúng địa chỉ đó: cache dò feed chỉ theo blog_url nên không được
+    # dùng, nếu không đổi trường rss sẽ không có tác dụng cho tới khi kết quả cũ hết hạn
+    use_discovery = cache is not None and not rsslink
+    cached = cache.discovered_feed(blog_url) if use_discovery else None
+    try:
+        if cached:
+            response = _probe_feed(cached[1], session, cache, signature, request_timeout, errors, deadline, stats)
+            if response is not None:
+                return [cached[0], cached[1], response]
+            logging.info(f"Địa chỉ feed đã lưu {cached[1]} không còn truy cập được, dò lại toàn bộ")
+            cache.forget_discovery(blog_url)
+
+        for feed_url in feed_urls:
+            if cached and feed_url == cached[1]:
+                continue
+            response = _probe_feed(feed_url, session, cache, signature, request_timeout, errors, deadline, stats)
+            if response is not None:
+                feed_type = feed_url.split('/')[-1].split('.')[0]
+                if use_discovery:
+                    cache.store_discovery(blog_url, feed_type, feed_url)
+                return [feed_type, feed_url, response]
+    except requests.ConnectionError as e:
+        errors.append(type(e).__name__)
+        logging.warning(f"Không thể kết nối tới {blog_url}, bỏ qua các địa chỉ feed còn lại: {e}")
+        return ['none', blog_url, None]
     logging.warning(f"Không thể tìm thấy liên kết subscription: {friend}")
-    return ['none', friend.get("link", "")]
+    return ['none', friend.get("link", ""), None]
 
-def parse_feed(url, session, count=5, blog_url=''):
+def _request_feed(feed_url, session, cache=None, signature=None, request_timeout=timeout, deadline=None, stats=None):
+    """
+    Gửi GET dạng stream tới feed, kèm header có điều kiện nếu cache có kết quả ứng với signature.
+    Nội dung chưa được tải cho tới khi đọc response.
+    """
+    headers = HEADERS_XML
+    if cache is not None and signature is not None:
+        headers = {**HEADERS_XML, **cache.conditional_headers(feed_url, signature)}
+    if stats is not None:
+        stats['attempts'] += 1
+    response = session.get(feed_url, headers=headers, timeout=_bounded_timeout(request_timeout, deadline), stream=True)
+    _record_response(stats, response)
+    return response
+
+def _record_response(stats, response):
+    """
+    Ghi trạng thái HTTP, thời gian kết nối và thời gian tới byte đầu tiên (response.elapsed) vào stats.
+    """
+    if stats is None:
+        return
+    stats['http_status'] = response.status_code
+    stats['connect'] += pop_connect_time(response)
+    stats['ttfb'] = response.elapsed.total_seconds()
+
+def _probe_feed(feed_url, session, cache=None, signature=None, request_timeout=timeout, errors=None, deadline=None,
+                stats=None):
+    """
+    Thử truy cập địa chỉ feed. Nếu nhận 200 (hoặc 304 với request có điều kiện) thì trả về response
+    chưa đọc nội dung; ngược lại đóng kết nối ngay sau dòng trạng thái, không tải phần thân, và trả về None.
+    Lỗi kết nối (requests.ConnectionError) được ném ra để discover_feed dừng dò cả host.
+    """
+    try:
+        response = _request_feed(feed_url, session, cache, signature, request_timeout, deadline, stats)
+    except requests.ConnectionError:
+        raise
+    except requests.RequestException as e:
+        if errors is not None:
+            errors.append(type(e).__name__)
+        return None
+    if response.status_code == 200 or response.status_code == 304:
+        return response
+    if errors is not None:
+        errors.append(f"HTTP {response.status_code}")
+    response.close()
+    return None
+
+def _feed_signature(count, blog_url, lean=False):
+    return f"{count}|{blog_url}|{'lean' if lean else 'full'}"
+
+def parse_feed(url, session, count=5, blog_url='', cache=None, response=None, lean=False, max_bytes=None,
+               request_timeout=timeout, deadline=None, stats=None, parse_pool=None):
     """
     Phân tích feed Atom hoặc RSS2 và trả về từ điển chứa tên website, tác giả, liên kết gốc và nội dung chi tiết của mỗi bài viết.
 
@@ -130,53 +332,54 @@ def parse_feed(url, session, count=5, blog_url=''):
     url (str): URL của feed Atom hoặc RSS2.
     session (requests.Session): Đối tượng session dùng cho request.
     count (int): Số bài viết tối đa cần lấy. Nếu nhỏ hơn thì lấy tất cả, nếu số bài viết lớn hơn thì chỉ lấy count bài viết đầu tiên.
+    blog_url (str): Địa chỉ blog, dùng để sửa liên kết bài viết trỏ tới ip hoặc localhost.
+    cache (FeedCache): Bộ nhớ đệm feed. Nếu có, gửi request có điều kiện và dùng lại kết quả cũ khi máy chủ trả về 304.
+    response (requests.Response): Response đã có sẵn từ discover_feed; nếu có sẽ không gửi request mới.
+    lean (bool): Chế độ gọn nhẹ, chỉ lấy tiêu đề, liên kết, thời gian và dừng phân tích sớm khi đã đủ bài viết.
+    max_bytes (int): Dung lượng tối đa được tải của feed, None là không giới hạn.
+    request_timeout (tuple): Thời gian chờ kết nối và đọc.
+    deadline (float): Mốc time.monotonic() phải kết thúc, hết giờ thì ném CrawlDeadlineExceeded.
+    stats (dict): Bản ghi số liệu của bạn bè, được cộng thêm số byte đã tải và thời gian phân tích.
+    parse_pool (ProcessPoolExecutor): Nếu có, thread hiện tại chỉ tải nội dung, việc phân tích (feedparser,
+                                      dò bảng mã, phân tích thời gian) chạy trong pool tiến trình này.
 
     Trả về:
     dict: Từ điển chứa tên website, tác giả, liên kết gốc và nội dung chi tiết của mỗi bài viết.
     """
+    signature = _feed_signature(count, blog_url, lean)
     try:
-        response = session.get(url, headers=HEADERS_XML, timeout=timeout)
-        response.encoding = response.apparent_encoding or 'utf-8'
-        feed = feedparser.parse(response.text)
-        
-        result = {
-            'website_name': feed.feed.title if 'title' in feed.feed else '', # type: ignore
-            'author': feed.feed.author if 'author' in feed.feed else '', # type: ignore
-            'link': feed.feed.link if 'link' in feed.feed else '', # type: ignore
-            'articles': []
-        }
-        
-        for _ , entry in enumerate(feed.entries):
-            
-            if 'published' in entry:
-                published = format_published_time(entry.published)
-            elif 'updated' in entry:
-                published = format_published_time(entry.updated)
-                # Xuất thông tin cảnh báo
-                logging.warning(f"Bài viết {entry.title} không chứa thời gian xuất bản, đã sử dụng thời gian cập nhật {published}")
-            else:
-                published = ''
-                logging.warning(f"Bài viết {entry.title} không chứa bất kỳ thông tin thời gian nào, vui lòng kiểm tra bài gốc, đặt thành thời gian mặc định")
-            
-            # Xử lý lỗi có thể có trong liên kết, ví dụ như ip hoặc localhost
-            article_link = replace_non_domain(entry.link, blog_url) if 'link' in entry else '' # type: ignore
-            
-            article = {
-                'title': entry.title if 'title' in entry else '',
-                'author': result['author'],
-                'link': article_link,
-                'published': published,
-                'summary': entry.summary if 'summary' in entry else '',
-                'content': entry.content[0].value if 'content' in entry and entry.content else entry.description if 'description' in entry else ''
-            }
-            result['articles'].append(article)
-        
-        # Sắp xếp bài viết theo thời gian và chỉ lấy count bài viết đầu tiên
-        result['articles'] = sorted(result['articles'], key=lambda x: datetime.strptime(x['published'], '%Y-%m-%d %H:%M'), reverse=True)
-        if count < len(result['articles']):
-            result['articles'] = result['articles'][:count]
+        if response is None:
+            response = _request_feed(url, session, cache, signature, request_timeout, deadline, stats)
+        if response.status_code == 304:
+            response.close()
+            cached = cache.cached_result(url, signature) if cache is not None else None
+            if cached is not None:
+                logging.info(f"Feed {url} không thay đổi (304), sử dụng lại kết quả đã lưu")
+                return cached
+            response = _request_feed(url, session, request_timeout=request_timeout, deadline=deadline, stats=stats)
+        body, complete = _read_body(response, max_bytes, deadline)
+        if not complete:
+            logging.warning(f"Feed {url} vượt quá giới hạn {max_bytes} byte, chỉ phân tích phần đã tải")
+        content_hash = _body_hash(body) if cache is not None else None
+        result = cache.result_for_body(url, signature, content_hash) if cache is not None else None
+        if result is not None:
+            # Nội dung giống hệt lần trước: bỏ qua feedparser, dò bảng mã và phân tích thời gian
+            logging.info(f"Feed {url} không thay đổi nội dung, sử dụng lại kết quả đã phân tích")
+            parse_time = 0.0
+        elif parse_pool is not None:
+            result, parse_time = _parse_in_pool(parse_pool, body, count, blog_url, lean, complete, deadline)
+        else:
+            result, parse_time = _timed_parse_feed_body(body, count, blog_url, lean, complete)
+        if stats is not None:
+            stats['bytes'] += len(body)
+            stats['parse'] += parse_time
+
+        if cache is not None and response.status_code == 200:
+            cache.store(url, response, result, signature, content_hash)
         
         return result
+    except CrawlDeadlineExceeded:
+        raise
     except Exception as e:
         logging.error(f"Không thể phân tích địa chỉ FEED: {url}, vui lòng tự kiểm tra nguyên nhân!")
         return {
@@ -186,6 +389,281 @@ def parse_feed(url, session, count=5, blog_url=''):
             'articles': []
         }
 
+def _body_hash(body):
+    """
+    Băm nhanh nội dung feed (BLAKE2b 128 bit), dùng để nhận ra feed giống hệt lần trước.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def _read_body(response, max_bytes=None, deadline=None):
+    """
+    Đọc nội dung response theo từng khối, dừng lại khi vượt quá max_bytes.
+    Nếu có deadline thì kiểm tra sau mỗi khối và ném CrawlDeadlineExceeded khi đã hết giờ.
+
+    Trả về:
+    tuple: (nội dung dạng bytes, True nếu đã đọc hết nội dung).
+    """
+    if max_bytes is None and deadline is None:
+        return response.content, True
+    chunks = []
+    size = 0
+    read1 = getattr(response.raw, 'read1', None) if deadline is not None else None
+    if read1 is not None:
+        # read1 trả về ngay phần dữ liệu đã nhận, để máy chủ nhỏ giọt từng byte không giữ vòng đọc quá deadline
+        stream = iter(lambda: read1(64 * 1024, decode_content=True), b'')
+    else:
+        stream = response.iter_content(chunk_size=64 * 1024)
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            size += len(chunk)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise CrawlDeadlineExceeded()
+            if max_bytes is not None and size > max_bytes:
+                return b''.join(chunks)[:max_bytes], False
+    finally:
+        response.close()
+    return b''.join(chunks), True
+
+def _decode_body(body):
+    """
+    Giải mã nội dung feed giống response.text với encoding = apparent_encoding.
+    """
+    encoding = chardet.detect(body)['encoding'] if chardet is not None else None
+    try:
+        return str(body, encoding or 'utf-8', errors='replace')
+    except LookupError:
+        return str(body, 'utf-8', errors='replace')
+
+# Thẻ đóng của một bài viết trong Atom (entry) hoặc RSS (item), có thể kèm namespace
+_ENTRY_END_RE = re.compile(rb'</(?:[\w.-]+:)?(?:entry|item)\s*>', re.IGNORECASE)
+# Thẻ gốc của feed, dùng để đóng lại feed bị cắt ngang
+_ROOT_RE = re.compile(rb'<((?:[\w.-]+:)?)(feed|rss|RDF)\b')
+
+def _close_truncated_feed(body):
+    """
+    Bỏ bài viết dang dở ở cuối nội dung bị cắt do giới hạn dung lượng và đóng lại thẻ gốc để feed vẫn hợp lệ.
+    """
+    last_end = None
+    for last_end in _ENTRY_END_RE.finditer(body):
+        pass
+    root = _ROOT_RE.search(body)
+    if last_end is None or root is None:
+        return body
+    prefix, name = root.group(1), root.group(2)
+    closing = {
+        b'feed': b'</' + prefix + b'feed>',
+        b'rss': b'</channel></rss>',
+        b'RDF': b'</' + prefix + b'RDF>'
+    }[name]
+    return body[:last_end.end()] + closing
+
+def _cut_after_entries(body, max_entries):
+    """
+    Giữ lại max_entries bài viết đầu tiên cùng phần đầu và phần đóng của feed.
+
+    Trả về:
+    tuple | None: (nội dung đã cắt, phần các bài viết còn lại), None nếu feed không có nhiều hơn max_entries bài viết.
+    """
+    nth_end = last_end = None
+    for index, match in enumerate(_ENTRY_END_RE.finditer(body), 1):
+        if index == max_entries:
+            nth_end = match.end()
+        last_end = match.end()
+    if nth_end is None or last_end == nth_end:
+        return None
+    return body[:nth_end] + body[last_end:], body[nth_end:last_end]
+
+# Thẻ thời gian của bài viết (published, pubDate, updated, dc:date...), giá trị có thể nằm trong CDATA
+_DATE_TAG_RE = re.compile(
+    rb'<(?:[\w.-]+:)?(?:published|pubDate|updated|date|issued|modified|created)\b[^>]*>'
+    rb'\s*(?:<!\[CDATA\[)?\s*([^<\]]*)',
+    re.IGNORECASE
+)
+
+def _newest_tail_timestamp(tail):
+    """
+    Quét nhanh (không qua feedparser) mọi thẻ thời gian trong phần bài viết bị bỏ qua ở chế độ lean.
+
+    Trả về:
+    int | None: Epoch lớn nhất tìm thấy (0 nếu không có thẻ nào), None nếu có giá trị không phân tích được.
+    """
+    newest = 0
+    for match in _DATE_TAG_RE.finditer(tail):
+        timestamp = parse_timestamp(match.group(1).strip().decode('utf-8', errors='replace'))
+        if timestamp is None:
+            return None
+        newest = max(newest, timestamp)
+    return newest
+
+def _entry_timestamp(entry):
+    """
+    Lấy epoch của bài viết trong feed. feedparser đã phân tích sẵn các định dạng RFC 822 / ISO 8601
+    vào published_parsed / updated_parsed (UTC), chỉ khi không có mới phải tự phân tích chuỗi.
+    """
+    if 'published' in entry:
+        if entry.get('published_parsed'):
+            return calendar.timegm(entry.published_parsed)
+        return parse_timestamp(entry.published)
+    if 'updated' in entry:
+        if entry.get('updated_parsed'):
+            timestamp = calendar.timegm(entry.updated_parsed)
+        else:
+            timestamp = parse_timestamp(entry.updated)
+        # Xuất thông tin cảnh báo
+        logging.warning(f"Bài viết {entry.get('title', '')} không chứa thời gian xuất bản, đã sử dụng thời gian cập nhật {format_timestamp(timestamp)}")
+        return timestamp
+    logging.warning(f"Bài viết {entry.get('title', '')} không chứa bất kỳ thông tin thời gian nào, vui lòng kiểm tra bài gốc, đặt thành thời gian mặc định")
+    return None
+
+def _parse_feed_body(body, count=5, blog_url='', lean=False, complete=True):
+    """
+    Phân tích nội dung feed đã tải về thành từ điển kết quả của parse_feed.
+
+    Ở chế độ lean, trước tiên chỉ phân tích count bài viết đầu tiên rồi quét nhanh thẻ thời gian của các bài viết
+    còn lại; nếu không bài viết nào phía sau mới hơn (trường hợp phổ biến) thì dừng tại đó, ngược lại mới phân tích
+    toàn bộ feed và chọn count bài viết mới nhất.
+    Chỉ những bài viết được giữ lại mới được trích xuất tiêu đề và liên kết.
+
+    Tham số:
+    body (bytes): Nội dung feed.
+    count (int): Số bài viết tối đa cần lấy.
+    blog_url (str): Địa chỉ blog, dùng để sửa liên kết bài viết trỏ tới ip hoặc localhost.
+    lean (bool): Chế độ gọn nhẹ.
+    complete (bool): False nếu nội dung bị cắt do giới hạn dung lượng.
+
+    Trả về:
+    dict: Từ điển chứa tên website, tác giả, liên kết gốc và danh sách bài viết.
+    """
+    if not complete:
+        body = _close_truncated_feed(body)
+
+    if lean:
+        cut = _cut_after_entries(body, count)
+        if cut is not None:
+            prefix, tail = cut
+            feed = feedparser.parse(_decode_body(prefix))
+            dated = [(_entry_timestamp(entry), entry) for entry in feed.entries]
+            times = [timestamp for timestamp, _ in dated]
+            # Chỉ dừng sớm khi chứng minh được không bài viết nào phía sau mới hơn bài cũ nhất đã giữ
+            if None not in times and times:
+                newest_tail = _newest_tail_timestamp(tail)
+                if newest_tail is not None and newest_tail <= min(times):
+                    return _build_lean_result(feed, dated, count, blog_url)
+        feed = feedparser.parse(_decode_body(body))
+        dated = [(_entry_timestamp(entry), entry) for entry in feed.entries]
+        return _build_lean_result(feed, dated, count, blog_url)
+
+    feed = feedparser.parse(_decode_body(body))
+    
+    result = {
+        'website_name': feed.feed.title if 'title' in feed.feed else '', # type: ignore
+        'author': feed.feed.author if 'author' in feed.feed else '', # type: ignore
+        'link': feed.feed.link if 'link' in feed.feed else '', # type: ignore
+        'articles': []
+    }
+    
+    for _ , entry in enumerate(feed.entries):
+        
+        timestamp = _entry_timestamp(entry)
+        
+        # Xử lý lỗi có thể có trong liên kết, ví dụ như ip hoặc localhost
+        article_link = replace_non_domain(entry.link, blog_url) if 'link' in entry else '' # type: ignore
+        
+        article = {
+            'title': entry.title if 'title' in entry else '',
+            'author': result['author'],
+            'link': article_link,
+            'published': format_timestamp(timestamp),
+            'timestamp': timestamp,
+            'summary': entry.summary if 'summary' in entry else '',
+            'content': entry.content[0].value if 'content' in entry and entry.content else entry.description if 'description' in entry else ''
+        }
+        result['articles'].append(article)
+    
+    # Sắp xếp bài viết theo thời gian và chỉ lấy count bài viết đầu tiên
+    result['articles'].sort(key=_timestamp_key, reverse=True)
+    if count < len(result['articles']):
+        result['articles'] = result['articles'][:count]
+    return result
+
+def _timed_parse_feed_body(body, count, blog_url, lean, complete):
+    """
+    Gọi _parse_feed_body và đo thời gian phân tích (trong tiến trình thực sự phân tích, không tính thời gian chờ pool).
+
+    Trả về:
+    tuple: (kết quả, số giây phân tích).
+    """
+    start = time.perf_counter()
+    result = _parse_feed_body(body, count, blog_url, lean, complete)
+    return result, time.perf_counter() - start
+
+def _parse_in_pool(parse_pool, body, count, blog_url, lean, complete, deadline=None):
+    """
+    Phân tích nội dung feed trong pool tiến trình. Thời gian chờ bị giới hạn bởi deadline;
+    nếu pool hỏng (tiến trình con bị kết thúc) thì phân tích ngay trong thread hiện tại.
+    """
+    try:
+        future = parse_pool.submit(_timed_parse_feed_body, body, count, blog_url, lean, complete)
+    except (BrokenProcessPool, RuntimeError):
+        return _timed_parse_feed_body(body, count, blog_url, lean, complete)
+    try:
+        return future.result(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        future.cancel()
+        raise CrawlDeadlineExceeded()
+    except BrokenProcessPool:
+        logging.warning("Pool phân tích feed đã hỏng, phân tích trong thread hiện tại")
+        return _timed_parse_feed_body(body, count, blog_url, lean, complete)
+
+def _init_parse_worker(level, fmt):
+    # Tiến trình con được khởi tạo bằng spawn, cấu hình logging giống tiến trình chính
+    logging.basicConfig(level=level, format=fmt)
+
+def create_parse_pool(workers=1, log_format=logging.BASIC_FORMAT):
+    """
+    Tạo pool tiến trình cho giai đoạn phân tích feed, tách khỏi các thread tải mạng.
+
+    Tham số:
+    workers (int): Số tiến trình, 0 là số lõi CPU. None (chưa đặt) hoặc 1 (hoặc máy chỉ có một lõi) thì không tạo pool.
+    log_format (str): Định dạng logging của các tiến trình con (spawn không kế thừa cấu hình logging).
+
+    Trả về:
+    ProcessPoolExecutor | None: Pool phân tích, None nếu phân tích ngay trong thread tải.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers is None or workers <= 1:
+        return None
+    # spawn: không fork tiến trình đang có nhiều thread và khóa của session
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_parse_worker, initargs=(logging.getLogger().level, log_format))
+
+def _timestamp_key(article):
+    return article['timestamp'] if article['timestamp'] is not None else 0
+
+def _build_lean_result(feed, dated, count, blog_url):
+    """
+    Chọn count bài viết mới nhất từ danh sách (timestamp, entry) rồi mới trích xuất các trường cần dùng.
+    """
+    author = feed.feed.author if 'author' in feed.feed else '' # type: ignore
+    newest = heapq.nlargest(count, dated, key=lambda x: x[0] if x[0] is not None else 0)
+    return {
+        'website_name': feed.feed.title if 'title' in feed.feed else '', # type: ignore
+        'author': author,
+        'link': feed.feed.link if 'link' in feed.feed else '', # type: ignore
+        'articles': [
+            {
+                'title': entry.title if 'title' in entry else '',
+                'author': author,
+                'link': replace_non_domain(entry.link, blog_url) if 'link' in entry else '', # type: ignore
+                'published': format_timestamp(timestamp),
+                'timestamp': timestamp
+            }
+            for timestamp, entry in newest
+        ]
+    }
+
 def replace_non_domain(link: str, blog_url: str) -> str:
     """
     Chưa triển khai
@@ -215,7 +693,8 @@ def replace_non_domain(link: str, blog_url: str) -> str:
         logging.warning(f"Lỗi khi thay thế liên kết: {link}, error: {e}")
         return link
 
-def process_friend(friend, session, count, specific_RSS=[]):
+def process_friend(friend, session, count, specific_RSS=[], cache=None, lean=False, max_bytes=None,
+                   request_timeout=timeout, deadline=None, parse_pool=None, full_feeds=None):
     """
     Xử lý thông tin blog của một người bạn.
 
@@ -224,10 +703,32 @@ def process_friend(friend, session, count, specific_RSS=[]):
     session (requests.Session): Đối tượng session dùng cho request.
     count (int): Số bài viết tối đa cho mỗi blog.
     specific_RSS (list): Danh sách từ điển chứa nguồn RSS cụ thể [{name, url}]
+    cache (FeedCache): Bộ nhớ đệm feed, có thể là None.
+    lean (bool): Phân tích feed ở chế độ gọn nhẹ, xem parse_feed.
+    max_bytes (int): Dung lượng tối đa được tải của mỗi feed, None là không giới hạn.
+    request_timeout (tuple): Thời gian chờ kết nối và đọc của mỗi request.
+    deadline (float): Mốc time.monotonic() phải kết thúc; hết giờ thì dừng và trả về status 'unfinished'.
+    parse_pool (ProcessPoolExecutor): Pool tiến trình phân tích feed, None là phân tích ngay trong thread này.
+    full_feeds (set): Địa chỉ blog đã chuẩn hóa (normalize_blog_url) luôn được phân tích đầy đủ kể cả ở chế độ lean,
+                      để các bước sau cần summary (như rss_subscribe) dùng lại được kết quả.
 
     Trả về:
-    dict: Từ điển chứa thông tin blog của bạn bè.
+    dict: Từ điển chứa thông tin blog của bạn bè; nếu lỗi thì có thêm trường error là nguyên nhân.
+          Trường stats chứa số liệu thu thập (xem telemetry.new_friend_stats).
     """
+    stats = new_friend_stats()
+    start = time.perf_counter()
+    if lean and full_feeds and normalize_blog_url(friend.get("link", "")) in full_feeds:
+        lean = False
+    result = _process_friend(friend, session, count, specific_RSS, cache, lean, max_bytes, request_timeout,
+                             deadline, stats, parse_pool)
+    stats['total'] = time.perf_counter() - start
+    stats['articles'] = len(result['articles'])
+    result['stats'] = stats
+    return result
+
+def _process_friend(friend, session, count, specific_RSS, cache, lean, max_bytes, request_timeout, deadline, stats,
+                    parse_pool=None):
     name = friend.get("name", "")
     blog_url = friend.get("link", "")
     avatar = friend.get("avatar", "")
@@ -236,20 +737,35 @@ def process_friend(friend, session, count, specific_RSS=[]):
     if specific_RSS is None:
         specific_RSS = []
     rss_feed = next((rss['url'] for rss in specific_RSS if rss['name'] == name), None)
-    if rss_feed:
-        feed_url = rss_feed
-        feed_type = 'specific'
-        logging.info(f"Blog \"{name}\" \" {blog_url} \" là nguồn RSS cụ thể \" {feed_url} \"")
-    else:
-        feed_type, feed_url = check_feed(friend, session)
-        logging.info(f"Loại feed của blog \"{name}\" \" {blog_url} \" là \"{feed_type}\", địa chỉ feed là \" {feed_url} \"")
+    response = None
+    errors = []
+    try:
+        if rss_feed:
+            feed_url = rss_feed
+            feed_type = 'specific'
+            logging.info(f"Blog \"{name}\" \" {blog_url} \" là nguồn RSS cụ thể \" {feed_url} \"")
+        else:
+            # Lần dò thành công giữ lại response để parse_feed không phải tải feed thêm lần nữa
+            feed_type, feed_url, response = discover_feed(friend, session, cache, _feed_signature(count, blog_url, lean),
+                                                          request_timeout, errors, deadline, stats)
+            logging.info(f"Loại feed của blog \"{name}\" \" {blog_url} \" là \"{feed_type}\", địa chỉ feed là \" {feed_url} \"")
+
+        if feed_type != 'none':
+            stats['feed_url'] = feed_url
+            feed_info = parse_feed(feed_url, session, count, blog_url, cache, response, lean, max_bytes,
+                                   request_timeout, deadline, stats, parse_pool)
+            if feed_info['articles']:
+                feed_registry.register(blog_url, feed_url, feed_info, count, lean)
+    except CrawlDeadlineExceeded:
+        logging.warning(f"Đã hết thời gian thu thập, dừng xử lý blog {blog_url} của {name}")
+        return _unfinished_result(friend)
 
     if feed_type != 'none':
-        feed_info = parse_feed(feed_url, session, count, blog_url)
         articles = [
             {
                 'title': article['title'],
                 'created': article['published'],
+                'timestamp': article.get('timestamp'),
                 'link': article['link'],
                 'author': name,
                 'avatar': avatar
@@ -270,10 +786,34 @@ def process_friend(friend, session, count, specific_RSS=[]):
         return {
             'name': name,
             'status': 'error',
+            'error': errors[-1] if errors else 'no_feed',
             'articles': []
         }
 
-def fetch_and_process_data(json_url, specific_RSS=[], count=5):
+def _unfinished_result(friend):
+    return {
+        'name': friend.get('name', ''),
+        'status': 'unfinished',
+        'error': 'deadline',
+        'articles': []
+    }
+
+def create_session(max_workers=10):
+    """
+    Tạo requests.Session với pool kết nối theo số worker, tránh urllib3 bỏ kết nối khi chạy nhiều request song song.
+    Các kết nối được đo thời gian thiết lập để ghi vào số liệu thu thập.
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def fetch_and_process_data(json_url, specific_RSS=[], count=5, cache_dir=None, discovery_ttl=72,
+                           max_workers=10, max_per_host=4, lean=False, max_bytes=None,
+                           baseline=None, recrawl_interval=24, session=None, scheduler=None, health=None,
+                           probe_timeout=5, probe_workers=4, time_budget=None, telemetry=None, parse_pool=None,
+                           full_feeds=None):
     """
     Đọc dữ liệu JSON và xử lý thông tin subscription, trả về dữ liệu thống kê và thông tin bài viết.
 
@@ -281,14 +821,40 @@ def fetch_and_process_data(json_url, specific_RSS=[], count=5):
     json_url (str): URL của file JSON chứa thông tin bạn bè.
     count (int): Số bài viết tối đa cho mỗi blog.
     specific_RSS (list): Danh sách từ điển chứa nguồn RSS cụ thể [{name, url}]
+    cache_dir (str): Thư mục lưu cache feed giữa các lần chạy, None để tắt cache.
+    discovery_ttl (float): Thời gian hiệu lực (giờ) của kết quả dò feed trong cache.
+    max_workers (int): Số bạn bè được xử lý đồng thời tối đa (số thread).
+    max_per_host (int): Số bạn bè cùng host được xử lý đồng thời tối đa, None là không giới hạn.
+    lean (bool): Phân tích feed ở chế độ gọn nhẹ, chỉ lấy các trường cần dùng.
+    max_bytes (int): Dung lượng tối đa được tải của mỗi feed, None là không giới hạn.
+    baseline (tuple): (result, errors) của lần chạy trước, xem incremental.load_snapshot. Nếu có thì chạy
+                      ở chế độ tăng dần: chỉ thu thập bạn bè đến hạn, đã thay đổi hoặc lần trước bị lỗi,
+                      bài viết của những bạn bè còn lại được giữ nguyên từ dữ liệu nền.
+    recrawl_interval (float): Ở chế độ tăng dần, số giờ tối thiểu giữa hai lần thu thập một bạn bè.
+    session (requests.Session): Session dùng lại giữa các lần gọi (chế độ daemon), None để tạo mới.
+    scheduler (FeedScheduler): Lịch thu thập thích ứng; nếu có thì thay cho recrawl_interval khi chọn bạn bè
+                               cần thu thập ở chế độ tăng dần, và được cập nhật theo kết quả thu thập.
+    health (HealthStore): Hồ sơ sức khỏe và cầu dao; nếu có thì bạn bè bị cách ly không thu thập cùng
+                          bạn bè khỏe mạnh mà chỉ được thăm dò khi đến lượt, trong làn riêng.
+    probe_timeout (float): Thời gian chờ (giây) kết nối và đọc khi thăm dò bạn bè bị cách ly.
+    probe_workers (int): Số bạn bè bị cách ly được thăm dò đồng thời tối đa.
+    time_budget (float): Thời gian tối đa (giây) cho cả lần thu thập, None là không giới hạn. Thời gian chờ
+                         của mỗi request được rút ngắn theo thời gian còn lại; khi hết giờ, các bạn bè chưa xử lý
+                         xong bị dừng, giữ bài viết cũ và được ghi vào errors.json với status 'unfinished'.
+    telemetry (CrawlTelemetry): Nếu có, số liệu của từng bạn bè được thu thập được ghi nhận vào đây.
+    parse_pool (ProcessPoolExecutor): Pool tiến trình phân tích feed (xem create_parse_pool). Nếu có, các worker
+                                      chỉ tải nội dung feed, việc phân tích được phân tán ra nhiều lõi CPU.
+    full_feeds (list): Địa chỉ blog luôn được phân tích đầy đủ kể cả khi lean=True, xem process_friend.
 
     Trả về:
     dict: Từ điển chứa dữ liệu thống kê và thông tin bài viết.
     """
-    session = requests.Session()
+    deadline = time.monotonic() + time_budget if time_budget else None
+    if session is None:
+        session = create_session(max_workers)
     
     try:
-        response = session.get(json_url, headers=HEADERS_JSON, timeout=timeout)
+        response = session.get(json_url, headers=HEADERS_JSON, timeout=_bounded_timeout(timeout, deadline))
         friends_data = response.json()
     except Exception as e:
         logging.error(f"Không thể lấy liên kết: {json_url} :{e}", exc_info=True)
@@ -301,33 +867,84 @@ def fetch_and_process_data(json_url, specific_RSS=[], count=5):
             break
 
     total_friends = len(friends_data) # không phải friends_data['friends']
-    active_friends = 0
-    error_friends = 0
-    total_articles = 0
-    article_data = []
-    error_friends_info = []
+    cache = FeedCache(cache_dir, discovery_ttl) if cache_dir else None
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_friend = {
-            executor.submit(process_friend, friend, session, count, specific_RSS): friend
-            for friend in friends_data # không phải friends_data['friends']
-        }
-        
-        for future in as_completed(future_to_friend):
-            friend = future_to_friend[future]
-            try:
-                result = future.result()
-                if result['status'] == 'active':
-                    active_friends += 1
-                    article_data.extend(result['articles'])
-                    total_articles += len(result['articles'])
-                else:
-                    error_friends += 1
-                    error_friends_info.append(friend)
-            except Exception as e:
-                logging.error(f"Lỗi khi xử lý {friend}: {e}", exc_info=True)
-                error_friends += 1
-                error_friends_info.append(friend)
+    previous, previous_errors = baseline if baseline is not None else (None, [])
+    # Luôn ghi lại thời gian thu thập khi có thư mục cache, để lần chạy tăng dần sau biết bạn bè nào đã đến hạn
+    state = CrawlState(cache_dir) if cache_dir or baseline is not None else None
+    if previous is not None and scheduler is not None:
+        friends_to_crawl = scheduler.due_friends(friends_data)
+        logging.info(f"Lịch thu thập: {len(friends_to_crawl)}/{total_friends} bạn bè đã đến hạn")
+    elif previous is not None:
+        friends_to_crawl = select_friends_to_crawl(friends_data, state, previous_errors, recrawl_interval * 3600)
+        logging.info(f"Chế độ tăng dần: thu thập lại {len(friends_to_crawl)}/{total_friends} bạn bè, số còn lại giữ nguyên dữ liệu lần trước")
+    else:
+        friends_to_crawl = friends_data
+
+    probes, skipped = [], []
+    if health is not None:
+        health.seed_from_errors(previous_errors)
+        friends_to_crawl, probes, skipped = health.partition(friends_to_crawl)
+        if probes or skipped:
+            logging.info(f"Cầu dao: thăm dò {len(probes)} bạn bè bị cách ly, bỏ qua {len(skipped)} bạn bè chưa đến lượt thăm dò")
+
+    worker = partial(process_friend, session=session, count=count, specific_RSS=specific_RSS, cache=cache,
+                     lean=lean, max_bytes=max_bytes, deadline=deadline, parse_pool=parse_pool,
+                     full_feeds={normalize_blog_url(url) for url in full_feeds or ()})
+    # Làn ưu tiên thấp: bạn bè bị cách ly được thăm dò song song trong pool riêng với timeout ngắn,
+    # không chiếm chỗ của bạn bè khỏe mạnh
+    probe_lane = _crawl_with_threads(probes, partial(worker, request_timeout=(probe_timeout, probe_timeout)),
+                                     probe_workers, deadline)
+    crawled = _crawl_with_threads(friends_to_crawl, worker, max_workers, deadline, max_per_host)
+
+    results = {}
+    unfinished = 0
+    for friend, result in chain(crawled, probe_lane):
+        if result is None and deadline is not None and time.monotonic() >= deadline:
+            result = _unfinished_result(friend)
+        results[id(friend)] = result
+        if telemetry is not None:
+            telemetry.record(friend, result)
+        if result is not None and result['status'] == 'unfinished':
+            # Chưa xử lý xong không có nghĩa là blog lỗi, không ghi nhận vào lịch thu thập và hồ sơ sức khỏe
+            unfinished += 1
+            continue
+        succeeded = result is not None and result['status'] == 'active'
+        if state is not None and succeeded:
+            state.mark_crawled(friend)
+        if scheduler is not None:
+            if succeeded:
+                scheduler.record_success(friend, result['articles'])
+            else:
+                scheduler.record_failure(friend)
+        if health is not None:
+            if succeeded:
+                if health.is_quarantined(friend):
+                    logging.info(f"Blog {friend.get('link', '')} đã hoạt động trở lại, gỡ cách ly")
+                health.record_success(friend)
+            else:
+                health.record_failure(friend, result.get('error', 'no_feed') if result is not None else 'exception')
+    for friend in skipped:
+        # Bạn bè bị cách ly chưa đến lượt thăm dò: tính là lỗi, bài viết cũ vẫn được giữ lại khi hợp nhất
+        results[id(friend)] = {'name': friend.get('name', ''), 'status': 'error', 'error': 'quarantined', 'articles': []}
+
+    article_data, error_friends_info = _merge_friend_results(friends_data, results, previous, previous_errors, count)
+    error_friends = len(error_friends_info)
+    active_friends = total_friends - error_friends
+    total_articles = len(article_data)
+
+    if state is not None:
+        state.save(friends_data)
+    if scheduler is not None:
+        scheduler.save(friends_data)
+    if health is not None:
+        health.save(friends_data)
+    if cache is not None:
+        cache.save(friends_data, [rss['url'] for rss in specific_RSS or []])
+    if telemetry is not None:
+        telemetry.finish()
+    if unfinished:
+        logging.warning(f"Đã hết thời gian thu thập ({time_budget} giây), {unfinished} bạn bè chưa xử lý xong")
 
     result = {
         'statistical_data': {
@@ -339,11 +956,151 @@ def fetch_and_process_data(json_url, specific_RSS=[], count=5):
         },
         'article_data': article_data
     }
+    if time_budget:
+        result['statistical_data']['unfinished_num'] = unfinished
     
     logging.info(f"Đã hoàn thành xử lý dữ liệu, tổng cộng có {total_friends} bạn bè, trong đó {active_friends} blog có thể truy cập, {error_friends} blog không thể truy cập")
 
     return result, error_friends_info
 
+def _merge_friend_results(friends, results, previous=None, previous_errors=[], count=5):
+    """
+    Tổng hợp bài viết và danh sách lỗi từ kết quả thu thập của từng bạn bè.
+
+    Bạn bè không được thu thập trong lần này giữ nguyên bài viết và trạng thái của lần trước;
+    bạn bè thu thập thành công được hợp nhất bài viết mới với bài viết cũ theo liên kết;
+    bạn bè thu thập thất bại bị tính là lỗi nhưng bài viết cũ vẫn được giữ lại.
+
+    Tham số:
+    friends (list): Danh sách bạn bè hiện tại.
+    results (dict): id(friend) -> kết quả process_friend (None nếu lỗi), chỉ chứa bạn bè đã thu thập.
+    previous (dict): Dữ liệu all.json lần trước, None nếu không chạy tăng dần.
+    previous_errors (list): Dữ liệu errors.json lần trước.
+    count (int): Số bài viết tối đa cho mỗi blog.
+
+    Trả về:
+    tuple: (article_data, error_friends_info)
+    """
+    previous_articles = {}
+    if previous is not None:
+        for article in previous.get('article_data', []):
+            previous_articles.setdefault(article.get('author', ''), []).append(article)
+    failed_links = {
+        error.get('link', '') if isinstance(error, dict) else error[1]
+        for error in previous_errors
+    }
+
+    article_data = []
+    error_friends_info = []
+    for friend in friends:
+        name = friend.get('name', '')
+        old_articles = previous_articles.get(name, [])
+        if id(friend) in results:
+            result = results[id(friend)]
+            if result is not None and result['status'] == 'active':
+                articles = result['articles']
+                if old_articles:
+                    articles = _merge_articles_by_link(articles, old_articles, friend, count)
+                article_data.extend(articles)
+            else:
+                # Giữ bài viết cũ để bạn bè không biến mất khi máy chủ của họ gặp sự cố tạm thời
+                article_data.extend(old_articles)
+                if result is not None and result['status'] == 'unfinished':
+                    error_friends_info.append(dict(friend, status='unfinished'))
+                else:
+                    error_friends_info.append(friend)
+        else:
+            article_data.extend(old_articles)
+            if friend.get('link', '') in failed_links:
+                error_friends_info.append(friend)
+    return article_data, error_friends_info
+
+def _merge_articles_by_link(new_articles, old_articles, friend, count):
+    """
+    Hợp nhất bài viết mới và cũ của một bạn bè theo liên kết (bài mới được ưu tiên), giữ count bài mới nhất.
+    """
+    merged = {article['link']: article for article in old_articles}
+    merged.update({article['link']: article for article in new_articles})
+    articles = sorted(merged.values(), key=article_timestamp, reverse=True)[:count]
+    avatar = friend.get('avatar', '')
+    return [dict(article, avatar=avatar) for article in articles]
+
+def _crawl_with_threads(friends, worker, max_workers=10, deadline=None, max_per_host=None):
+    """
+    Xử lý danh sách bạn bè bằng ThreadPoolExecutor. Các tác vụ được đưa vào pool ngay khi gọi hàm,
+    generator trả về cho ra lần lượt (friend, result) theo thứ tự hoàn thành; result là None nếu xử lý gặp lỗi.
+
+    Nếu có max_per_host, mỗi host chỉ có tối đa bấy nhiêu bạn bè trong pool, các bạn bè còn lại của host đó
+    xếp hàng và chỉ được đưa vào pool khi một tác vụ cùng host xong, nên không chiếm thread để chờ.
+
+    Nếu có deadline (time.monotonic()), các tác vụ vẫn chưa xong sau deadline + CANCEL_GRACE giây bị hủy
+    và bỏ lại, friend của chúng (kể cả các bạn bè còn xếp hàng) được trả về với result là None.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    future_to_friend = {}
+    running = Counter()
+    waiting = defaultdict(deque)
+
+    def submit(friend, host):
+        running[host] += 1
+        future_to_friend[executor.submit(worker, friend)] = (friend, host)
+
+    def release(host):
+        running[host] -= 1
+        if waiting[host]:
+            submit(waiting[host].popleft(), host)
+
+    for friend in friends:
+        host = urlparse(friend.get("link", "")).netloc
+        if max_per_host and running[host] >= max_per_host:
+            waiting[host].append(friend)
+        else:
+            submit(friend, host)
+    return _collect_futures(executor, future_to_friend, release, waiting, deadline)
+
+# Thời gian (giây) chờ thêm sau deadline để các worker tự dừng trước khi bị bỏ lại
+CANCEL_GRACE = 5
+
+def _collect_futures(executor, future_to_friend, release, waiting, deadline=None):
+    try:
+        while future_to_friend:
+            wait = None if deadline is None else max(0, deadline + CANCEL_GRACE - time.monotonic())
+            done, _ = wait_futures(list(future_to_friend), timeout=wait, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                friend, host = future_to_friend.pop(future)
+                release(host)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"Lỗi khi xử lý {friend}: {e}", exc_info=True)
+                    result = None
+                yield friend, result
+
+        left = [friend for friend, _ in future_to_friend.values()]
+        left += [friend for queue in waiting.values() for friend in queue]
+        if left:
+            logging.warning(f"Đã hết thời gian thu thập, bỏ lại {len(left)} tác vụ chưa hoàn thành")
+            for future in future_to_friend:
+                future.cancel()
+            for friend in left:
+                yield friend, None
+    finally:
+        executor.shutdown(wait=not future_to_friend, cancel_futures=True)
+
+def _ensure_created(article):
+    """
+    Đặt thời gian mặc định cho bài viết không có thời gian và gắn epoch vào bài viết
+    để các bước sắp xếp, hợp nhất sau không phải phân tích lại chuỗi thời gian.
+    """
+    if article['created'] == '' or article['created'] == None:
+        article['created'] = '2024-01-01 00:00'
+        # Xuất thông tin cảnh báo
+        logging.warning(f"Bài viết {article['title']} không chứa thông tin thời gian, đã đặt thành thời gian mặc định 2024-01-01 00:00")
+        article.pop('timestamp', None)
+    article['timestamp'] = article_timestamp(article)
+
 def sort_articles_by_time(data):
     """
     Sắp xếp dữ liệu bài viết theo thời gian
@@ -356,105 +1113,277 @@ def sort_articles_by_time(data):
     """
     # Đảm bảo mỗi phần tử có thời gian
     for article in data['article_data']:
-        if article['created'] == '' or article['created'] == None:
-            article['created'] = '2024-01-01 00:00'
-            # Xuất thông tin cảnh báo
-            logging.warning(f"Bài viết {article['title']} không chứa thông tin thời gian, đã đặt thành thời gian mặc định 2024-01-01 00:00")
+        _ensure_created(article)
     
     if 'article_data' in data:
-        sorted_articles = sorted(
-            data['article_data'],
-            key=lambda x: datetime.strptime(x['created'], '%Y-%m-%d %H:%M'),
-            reverse=True
-        )
-        data['article_data'] = sorted_articles
+        data['article_data'].sort(key=lambda x: x['timestamp'], reverse=True)
     return data
 
-def marge_data_from_json_url(data, marge_json_url):
+def _link_key(link):
     """
-    Lấy dữ liệu từ file JSON khác và hợp nhất vào dữ liệu gốc.
+    Khóa so khớp liên kết khi hợp nhất: bỏ giao thức và fragment, chữ thường phần host, bỏ dấu gạch chéo ở cuối,
+    để http/https hoặc có/không có dấu gạch chéo của cùng một bài viết được coi là một.
+    """
+    parsed = urlparse((link or '').strip())
+    key = parsed.netloc.lower() + parsed.path.rstrip('/')
+    return key + '?' + parsed.query if parsed.query else key
 
-    Tham số:
-    data (dict): Từ điển chứa thông tin bài viết
-    marge_json_url (str): URL của file JSON chứa thông tin bài viết khác.
+def _fetch_json(url, session=None, cache=None):
+    """
+    Tải file JSON từ xa. Nếu có cache thì gửi request có điều kiện và dùng lại dữ liệu đã lưu khi nhận 304.
 
     Trả về:
-    dict: Từ điển thông tin bài viết sau khi hợp nhất, đã xử lý trùng lặp
+    dict | list | None: Dữ liệu JSON, None nếu không tải được.
     """
+    signature = 'json'
+    headers = dict(HEADERS_JSON)
+    if cache is not None:
+        headers.update(cache.conditional_headers(url, signature))
     try:
-        response = requests.get(marge_json_url, headers=HEADERS_JSON, timeout=timeout)
-        marge_data = response.json()
+        response = (session or requests).get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cache is not None:
+            cached = cache.cached_result(url, signature)
+            if cached is not None:
+                logging.info(f"{url} không thay đổi (304), sử dụng lại dữ liệu đã lưu")
+                return cached
+            response = (session or requests).get(url, headers=HEADERS_JSON, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
     except Exception as e:
-        logging.error(f"Không thể lấy liên kết: {marge_json_url}, vấn đề gặp phải là: {e}", exc_info=True)
-        return data
-    
-    if 'article_data' in marge_data:
-        logging.info(f"Bắt đầu hợp nhất dữ liệu, dữ liệu gốc có {len(data['article_data'])} bài viết, dữ liệu bên thứ ba có {len(marge_data['article_data'])} bài viết")
-        data['article_data'].extend(marge_data['article_data'])
-        data['article_data'] = list({v['link']:v for v in data['article_data']}.values())
-        logging.info(f"Đã hoàn thành hợp nhất dữ liệu, hiện có {len(data['article_data'])} bài viết")
+        logging.error(f"Không thể lấy liên kết: {url}, vấn đề gặp phải là: {e}", exc_info=True)
+        return None
+    if cache is not None:
+        cache.store(url, response, data, signature)
     return data
 
-import requests
+def _sorted_by_time(articles):
+    """
+    Gắn epoch vào từng bài viết và sắp xếp mới nhất trước. Dữ liệu all.json vốn đã được sắp xếp
+    nên Timsort chỉ cần duyệt một lượt.
+    """
+    for article in articles:
+        article['timestamp'] = article_timestamp(article)
+    articles.sort(key=lambda article: article['timestamp'], reverse=True)
+    return articles
 
-def marge_errors_from_json_url(errors, marge_json_url):
+def marge_data_from_json_url(data, marge_json_url, session=None, cache=None):
     """
-    Lấy thông tin lỗi từ file JSON mạng khác và duyệt, xóa trong errors,
-    thông tin liên kết bạn bè không tồn tại trong marge_errors.
+    Lấy dữ liệu từ một hoặc nhiều file all.json khác và hợp nhất vào dữ liệu gốc.
+
+    Các nguồn đều được sắp xếp theo epoch (mới nhất trước) rồi hợp nhất bằng heapq.merge trong một lượt,
+    kết quả đã sắp xếp sẵn nên deal_with_large_data không phải sắp xếp lại từ đầu.
+    Bài viết trùng nhau được so khớp theo liên kết đã chuẩn hóa; khi trùng, bản của dữ liệu gốc được giữ,
+    sau đó đến các nguồn từ xa theo thứ tự trong marge_json_url.
 
     Tham số:
-    errors (list): Danh sách chứa thông tin lỗi
-    marge_json_url (str): URL của file JSON chứa thông tin lỗi khác.
+    data (dict): Từ điển chứa thông tin bài viết
+    marge_json_url (str | list): URL (hoặc danh sách URL) của file JSON chứa thông tin bài viết khác.
+    session (requests.Session): Session dùng cho request, None thì dùng requests trực tiếp.
+    cache (FeedCache): Nếu có, tải có điều kiện và dùng lại dữ liệu đã lưu khi nhận 304.
 
     Trả về:
-    list: Danh sách thông tin lỗi sau khi hợp nhất
+    dict: Từ điển thông tin bài viết sau khi hợp nhất, đã xử lý trùng lặp và sắp xếp theo thời gian
     """
-    try:
-        response = requests.get(marge_json_url, timeout=10)  # Đặt thời gian chờ request
-        marge_errors = response.json()
-    except Exception as e:
-        logging.error(f"Không thể lấy liên kết: {marge_json_url}, vấn đề gặp phải là: {e}", exc_info=True)
-        return errors
+    urls = [marge_json_url] if isinstance(marge_json_url, str) else list(marge_json_url)
+    sources = [data.get('article_data', [])]
+    for url in urls:
+        marge_data = _fetch_json(url, session, cache)
+        if isinstance(marge_data, dict) and isinstance(marge_data.get('article_data'), list):
+            logging.info(f"Dữ liệu bên thứ ba {url} có {len(marge_data['article_data'])} bài viết")
+            sources.append(marge_data['article_data'])
+    if len(sources) == 1:
+        return data
+
+    logging.info(f"Bắt đầu hợp nhất dữ liệu, dữ liệu gốc có {len(sources[0])} bài viết, "
+                 f"{len(sources) - 1} nguồn bên thứ ba có {sum(map(len, sources[1:]))} bài viết")
+    # Nguồn có thứ hạng nhỏ nhất chứa liên kết là nguồn được giữ; bài viết không có liên kết không bị loại trùng
+    owner = {}
+    for rank, articles in enumerate(sources):
+        for article in articles:
+            key = _link_key(article.get('link'))
+            if key:
+                owner.setdefault(key, rank)
+
+    streams = [zip(repeat(rank), _sorted_by_time(articles)) for rank, articles in enumerate(sources)]
+    merged = []
+    emitted = set()
+    for rank, article in heapq.merge(*streams, key=lambda item: -item[1]['timestamp']):
+        key = _link_key(article.get('link'))
+        if key:
+            if owner[key] != rank or key in emitted:
+                continue
+            emitted.add(key)
+        merged.append(article)
 
-    # Trích xuất URL từ marge_errors
-    marge_urls = {item[1] for item in marge_errors}
+    data['article_data'] = merged
+    logging.info(f"Đã hoàn thành hợp nhất dữ liệu, hiện có {len(merged)} bài viết")
+    return data
+
+def marge_errors_from_json_url(errors, marge_json_url, session=None, cache=None):
+    """
+    Lấy thông tin lỗi từ một hoặc nhiều file errors.json khác, chỉ giữ lại trong errors
+    những bạn bè cũng bị lỗi ở mọi nguồn lấy được (so khớp theo liên kết đã chuẩn hóa).
 
-    # Sử dụng bộ lọc giữ lại URL trong errors xuất hiện trong marge_errors
-    filtered_errors = [error for error in errors if error[1] in marge_urls]
+    Tham số:
+    errors (list): Danh sách chứa thông tin lỗi
+    marge_json_url (str | list): URL (hoặc danh sách URL) của file JSON chứa thông tin lỗi khác.
+    session (requests.Session): Session dùng cho request, None thì dùng requests trực tiếp.
+    cache (FeedCache): Nếu có, tải có điều kiện và dùng lại dữ liệu đã lưu khi nhận 304.
+
+    Trả về:
+    list: Danh sách thông tin lỗi sau khi hợp nhất
+    """
+    urls = [marge_json_url] if isinstance(marge_json_url, str) else list(marge_json_url)
+    filtered_errors = errors
+    for url in urls:
+        marge_errors = _fetch_json(url, session, cache)
+        if not isinstance(marge_errors, list):
+            continue
+        # Mục lỗi là từ điển bạn bè, hoặc danh sách [name, link, avatar] ở định dạng cũ
+        marge_links = {
+            _link_key(item.get('link', '') if isinstance(item, dict) else item[1])
+            for item in marge_errors
+        }
+        filtered_errors = [
+            error for error in filtered_errors
+            if _link_key(error.get('link', '') if isinstance(error, dict) else error[1]) in marge_links
+        ]
 
     logging.info(f"Đã hoàn thành hợp nhất thông tin lỗi, sau khi hợp nhất có {len(filtered_errors)} bạn bè")
     return filtered_errors
 
-def deal_with_large_data(result):
+class _TopArticles:
+    """
+    Giữ max_articles bài viết mới nhất đã được đưa vào, mỗi tác giả tối đa per_author bài,
+    dùng min-heap theo (epoch, thứ tự ngược) nên bộ nhớ chỉ là O(max_articles).
+
+    Bài viết bị đẩy ra vì vượt giới hạn tác giả được đánh dấu xóa (xóa lười) trong heap chung,
+    heap được dựng lại khi số mục đã xóa vượt quá max_articles.
     """
-    Xử lý dữ liệu bài viết, giữ lại 150 bài đầu tiên và sự xuất hiện của tác giả trong các bài viết tiếp theo.
+
+    def __init__(self, max_articles, per_author=None):
+        self.max_articles = max_articles
+        self.per_author = per_author
+        self._heap = []        # Mục [key, article, alive], key = (epoch, -thứ tự) để bài đứng trước thắng khi cùng epoch
+        self._by_author = {}   # tác giả -> min-heap các mục còn sống của tác giả đó
+        self._live = 0
+        self._dead = 0
+
+    def offer(self, key, article):
+        if self.max_articles <= 0:
+            return
+        author = article.get('author', '')
+        mine = self._by_author.setdefault(author, [])
+        if self.per_author is not None and len(mine) >= self.per_author:
+            if self.per_author <= 0 or key <= mine[0][0]:
+                return
+            self._kill(heapq.heappop(mine))
+        elif self._live >= self.max_articles:
+            self._drop_dead()
+            if key <= self._heap[0][0]:
+                return
+            oldest = heapq.heappop(self._heap)
+            # Bài cũ nhất trong heap chung cũng là bài cũ nhất của tác giả đó
+            heapq.heappop(self._by_author[oldest[1].get('author', '')])
+            self._live -= 1
+        entry = [key, article, True]
+        heapq.heappush(self._heap, entry)
+        heapq.heappush(mine, entry)
+        self._live += 1
+
+    def _kill(self, entry):
+        entry[2] = False
+        self._live -= 1
+        self._dead += 1
+        if self._dead > self.max_articles:
+            self._heap = [entry for entry in self._heap if entry[2]]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def _drop_dead(self):
+        while self._heap and not self._heap[0][2]:
+            heapq.heappop(self._heap)
+            self._dead -= 1
+
+    def articles(self):
+        """
+        Các bài viết đang giữ, mới nhất trước.
+        """
+        return [entry[1] for entry in sorted((e for e in self._heap if e[2]), key=lambda e: e[0], reverse=True)]
+
+def retain_articles(articles, max_articles=150, per_author=None, window_days=None, keep_author_history=True, now=None):
+    """
+    Chọn các bài viết được giữ lại theo chính sách lưu giữ.
+
+    Một lượt duyệt chọn max_articles bài viết mới nhất trong cửa sổ thời gian, mỗi tác giả tối đa per_author bài,
+    bằng heap có kích thước cố định (không sắp xếp toàn bộ danh sách). Nếu keep_author_history thì duyệt thêm
+    một lượt để giữ các bài viết cũ hơn của những tác giả đã có mặt trong nhóm đó (vẫn theo per_author),
+    giống cách xử lý trước đây để trang tác giả vẫn hiển thị đủ bài viết.
+
+    Tham số:
+    articles (list): Danh sách bài viết, đã có trường timestamp (xem sort_articles_by_time).
+    max_articles (int): Số bài viết mới nhất được giữ, None là không giới hạn.
+    per_author (int): Số bài viết tối đa của mỗi tác giả, None là không giới hạn.
+    window_days (float): Chỉ giữ bài viết trong bấy nhiêu ngày gần nhất, None là không giới hạn.
+    keep_author_history (bool): Giữ thêm bài viết cũ của các tác giả có mặt trong max_articles bài mới nhất.
+    now (float): Thời điểm hiện tại (epoch), mặc định là time.time().
+
+    Trả về:
+    list: Bài viết được giữ lại, mới nhất trước.
+    """
+    since = None
+    if window_days is not None:
+        since = (time.time() if now is None else now) - window_days * 86400
+    top = _TopArticles(len(articles) if max_articles is None else max_articles, per_author)
+    for index, article in enumerate(articles):
+        if since is None or article['timestamp'] >= since:
+            top.offer((article['timestamp'], -index), article)
+    retained = top.articles()
+    if not keep_author_history or max_articles is None:
+        return retained
+
+    kept = {id(article) for article in retained}
+    counts = {}
+    for article in retained:
+        counts[article.get('author', '')] = counts.get(article.get('author', ''), 0) + 1
+    history = []
+    for article in articles:
+        author = article.get('author', '')
+        if id(article) in kept or author not in counts or (since is not None and article['timestamp'] < since):
+            continue
+        if per_author is not None and counts[author] >= per_author:
+            continue
+        counts[author] += 1
+        history.append(article)
+    if not history:
+        return retained
+    history.sort(key=lambda article: article['timestamp'], reverse=True)
+    return list(heapq.merge(retained, history, key=lambda article: article['timestamp'], reverse=True))
+
+def deal_with_large_data(result, max_articles=150, per_author=None, window_days=None, keep_author_history=True):
+    """
+    Xử lý dữ liệu bài viết theo chính sách lưu giữ (xem retain_articles): mặc định giữ lại 150 bài đầu tiên
+    và các bài viết tiếp theo của những tác giả có mặt trong 150 bài đó.
     
     Tham số:
     result (dict): Từ điển chứa dữ liệu thống kê và dữ liệu bài viết.
+    max_articles (int): Số bài viết mới nhất được giữ, None là không giới hạn.
+    per_author (int): Số bài viết tối đa của mỗi tác giả, None là không giới hạn.
+    window_days (float): Chỉ giữ bài viết trong bấy nhiêu ngày gần nhất, None là không giới hạn.
+    keep_author_history (bool): Giữ thêm bài viết cũ của các tác giả có mặt trong max_articles bài mới nhất.
     
     Trả về:
-    dict: Dữ liệu sau khi xử lý, chỉ chứa các bài viết cần thiết.
+    dict: Dữ liệu sau khi xử lý, chỉ chứa các bài viết cần thiết, mới nhất trước.
     """
-    result = sort_articles_by_time(result)
     article_data = result.get("article_data", [])
+    # Chỉ gắn epoch và thời gian mặc định, không sắp xếp toàn bộ: heap của retain_articles lo việc chọn và thứ tự
+    for article in article_data:
+        _ensure_created(article)
 
-    # Kiểm tra số lượng bài viết có lớn hơn 150 không
-    max_articles = 150
-    if len(article_data) > max_articles:
-        logging.info("Dữ liệu lớn, bắt đầu xử lý...")
-        # Lấy tập hợp tác giả của max_articles bài viết đầu tiên
-        top_authors = {article["author"] for article in article_data[:max_articles]}
-
-        # Lọc từ bài viết thứ {max_articles + 1}, chỉ giữ lại bài viết của tác giả xuất hiện trong max_articles bài đầu tiên
-        filtered_articles = article_data[:max_articles] + [
-            article for article in article_data[max_articles:]
-            if article["author"] in top_authors
-        ]
-
-        # Cập nhật article_data trong kết quả
-        result["article_data"] = filtered_articles
-        # Cập nhật dữ liệu thống kê trong kết quả
-        result["statistical_data"]["article_num"] = len(filtered_articles)
-        logging.info(f"Đã hoàn thành xử lý dữ liệu, giữ lại {len(filtered_articles)} bài viết")
-
+    retained = retain_articles(article_data, max_articles, per_author, window_days, keep_author_history)
+    if len(retained) < len(article_data):
+        logging.info(f"Đã hoàn thành xử lý dữ liệu, giữ lại {len(retained)}/{len(article_data)} bài viết")
+    result["article_data"] = retained
+    if "statistical_data" in result:
+        result["statistical_data"]["article_num"] = len(retained)
     return result
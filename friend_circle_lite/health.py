@@ -0,0 +1,103 @@
+import threading
+import time
+
+from friend_circle_lite.cache import load_json_file, dump_json_file
+
+
+class HealthStore:
+    """
+    Hồ sơ sức khỏe của từng bạn bè (số lần lỗi liên tiếp, lần thành công gần nhất, loại lỗi gần nhất),
+    lưu trong file JSON riêng (không phụ thuộc cache feed), kèm cầu dao ngắt (circuit breaker) cho các blog chết.
+
+    Bạn bè lỗi liên tiếp từ failure_threshold lần trở lên bị cách ly: không thu thập cùng bạn bè khỏe mạnh
+    nữa mà chỉ được thăm dò thưa dần (probe_interval * 2^(số lần lỗi vượt ngưỡng), tối đa max_probe_interval)
+    trong một làn riêng với timeout ngắn. Chỉ cần thăm dò thành công một lần là bạn bè trở lại bình thường.
+    """
+
+    def __init__(self, path=None, failure_threshold=3, probe_interval=24, max_probe_interval=168):
+        """
+        Tham số:
+        path (str): Đường dẫn file hồ sơ, None thì chỉ giữ trong bộ nhớ.
+        failure_threshold (int): Số lần lỗi liên tiếp để bị cách ly.
+        probe_interval (float): Khoảng cách (giờ) giữa hai lần thăm dò đầu tiên khi bị cách ly.
+        max_probe_interval (float): Khoảng cách (giờ) tối đa giữa hai lần thăm dò.
+        """
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval * 3600
+        self.max_probe_interval = max_probe_interval * 3600
+        self._lock = threading.Lock()
+        self._friends = load_json_file(self.path)
+
+    def seed_from_errors(self, previous_errors):
+        """
+        Tạo hồ sơ cho bạn bè có trong errors.json lần trước nhưng chưa có hồ sơ (tính là một lần lỗi),
+        để lần đầu bật tính năng vẫn tận dụng được lịch sử lỗi sẵn có.
+        """
+        with self._lock:
+            for error in previous_errors:
+                link = error.get('link', '') if isinstance(error, dict) else error[1]
+                if link and link not in self._friends:
+                    self._friends[link] = {'failures': 1, 'last_error': 'previous_run', 'last_attempt': 0}
+
+    def is_quarantined(self, friend):
+        with self._lock:
+            entry = self._friends.get(friend.get('link', ''), {})
+        return entry.get('failures', 0) >= self.failure_threshold
+
+    def partition(self, friends, now=None):
+        """
+        Chia danh sách bạn bè theo trạng thái cầu dao.
+
+        Trả về:
+        tuple: (healthy, probes, skipped) - bạn bè khỏe mạnh, bạn bè bị cách ly đã đến lượt thăm dò,
+               và bạn bè bị cách ly chưa đến lượt (bỏ qua trong lần này).
+        """
+        now = time.time() if now is None else now
+        healthy, probes, skipped = [], [], []
+        with self._lock:
+            for friend in friends:
+                entry = self._friends.get(friend.get('link', ''), {})
+                failures = entry.get('failures', 0)
+                if failures < self.failure_threshold:
+                    healthy.append(friend)
+                elif now - entry.get('last_attempt', 0) >= self._probe_delay(failures):
+                    probes.append(friend)
+                else:
+                    skipped.append(friend)
+        return healthy, probes, skipped
+
+    def _probe_delay(self, failures):
+        return min(self.probe_interval * 2 ** (failures - self.failure_threshold), self.max_probe_interval)
+
+    def record_success(self, friend, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._friends[friend.get('link', '')] = {
+                'failures': 0,
+                'last_success': now,
+                'last_attempt': now
+            }
+
+    def record_failure(self, friend, error_type, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = dict(self._friends.get(friend.get('link', ''), {}))
+            entry.update({
+                'failures': entry.get('failures', 0) + 1,
+                'last_error': error_type,
+                'last_attempt': now
+            })
+            self._friends[friend.get('link', '')] = entry
+
+    def save(self, friends=None):
+        """
+        Ghi hồ sơ xuống đĩa. Nếu truyền danh sách bạn bè hiện tại thì bỏ hồ sơ của các bạn bè đã bị xóa.
+        """
+        with self._lock:
+            if friends is not None:
+                links = {friend.get('link', '') for friend in friends}
+                self._friends = {link: entry for link, entry in self._friends.items() if link in links}
+            data = dict(self._friends)
+        if self.path is not None:
+            dump_json_file(self.path, data)
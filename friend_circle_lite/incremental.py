@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from friend_circle_lite.cache import load_json_file, dump_json_file
+
+
+def friend_fingerprint(friend):
+    """
+    Tạo dấu vân tay cho thông tin bạn bè (tên, liên kết, avatar, rss), dùng để phát hiện bạn bè đã thay đổi.
+    """
+    raw = '\n'.join(str(friend.get(key, '')) for key in ('name', 'link', 'avatar', 'rss'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class CrawlState:
+    """
+    Trạng thái thu thập của từng bạn bè (thời gian thu thập gần nhất và dấu vân tay),
+    lưu trong cache_dir/crawl_state.json. Nếu không có thư mục cache thì chỉ giữ trong bộ nhớ.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.path = os.path.join(cache_dir, 'crawl_state.json') if cache_dir else None
+        self._lock = threading.Lock()
+        self._friends = load_json_file(self.path)
+
+    def is_due(self, friend, interval, now=None):
+        """
+        Kiểm tra bạn bè có cần thu thập lại không: chưa từng thu thập, thông tin đã thay đổi,
+        hoặc đã quá interval giây kể từ lần thu thập gần nhất.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._friends.get(friend.get('link', ''))
+        if not entry or entry.get('fingerprint') != friend_fingerprint(friend):
+            return True
+        return now - entry.get('last_crawled', 0) >= interval
+
+    def mark_crawled(self, friend, now=None):
+        """
+        Ghi nhận bạn bè vừa được thu thập.
+        """
+        with self._lock:
+            self._friends[friend.get('link', '')] = {
+                'fingerprint': friend_fingerprint(friend),
+                'last_crawled': time.time() if now is None else now
+            }
+
+    def save(self, friends=None):
+        """
+        Ghi trạng thái xuống đĩa. Nếu truyền danh sách bạn bè hiện tại thì bỏ các bạn bè đã bị xóa.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            if friends is not None:
+                links = {friend.get('link', '') for friend in friends}
+                self._friends = {link: entry for link, entry in self._friends.items() if link in links}
+            data = dict(self._friends)
+        dump_json_file(self.path, data)
+
+
+def load_snapshot(all_path='./all.json', errors_path='./errors.json'):
+    """
+    Đọc kết quả của lần chạy trước làm dữ liệu nền cho chế độ thu thập tăng dần.
+
+    Trả về:
+    tuple: (result, errors); result là None nếu chưa có hoặc không đọc được all.json.
+    """
+    try:
+        with open(all_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None, []
+    except (OSError, ValueError) as e:
+        logging.warning(f"Không thể đọc dữ liệu lần trước {all_path}, sẽ thu thập toàn bộ: {e}")
+        return None, []
+
+    try:
+        with open(errors_path, 'r', encoding='utf-8') as f:
+            errors = json.load(f)
+    except (OSError, ValueError):
+        errors = []
+    return result, errors
+
+
+def select_friends_to_crawl(friends, state, previous_errors, interval, now=None):
+    """
+    Chọn những bạn bè cần thu thập trong lần chạy này: đến hạn, đã thay đổi, hoặc lần trước bị lỗi.
+
+    Tham số:
+    friends (list): Danh sách bạn bè hiện tại.
+    state (CrawlState): Trạng thái thu thập.
+    previous_errors (list): Nội dung errors.json của lần trước.
+    interval (float): Khoảng thời gian (giây) giữa hai lần thu thập một bạn bè.
+
+    Trả về:
+    list: Danh sách bạn bè cần thu thập.
+    """
+    failed_links = {
+        error.get('link', '') if isinstance(error, dict) else error[1]
+        for error in previous_errors
+    }
+    return [
+        friend for friend in friends
+        if friend.get('link', '') in failed_links or state.is_due(friend, interval, now)
+    ]
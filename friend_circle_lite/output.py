@@ -0,0 +1,145 @@
+import glob
+import gzip
+import json
+import logging
+import math
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli là phụ thuộc tùy chọn, thiếu thì chỉ tạo .gz
+    brotli = None
+
+
+def atomic_write_bytes(path, data):
+    """
+    Ghi file bằng cách ghi vào file tạm cùng thư mục rồi đổi tên, người đọc không bao giờ thấy file ghi dở.
+    Nội dung không đổi thì không ghi lại (giữ nguyên mtime để máy chủ tĩnh và cache không phải làm mới).
+
+    Trả về:
+    bool: True nếu file đã được ghi.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_json(path, data, minify=True, compress=True):
+    """
+    Ghi dữ liệu JSON kèm các bản nén sẵn path.gz và path.br (nếu có module brotli),
+    để máy chủ tĩnh (nginx gzip_static/brotli_static...) gửi thẳng mà không phải nén lại.
+    Bản nén không còn được tạo sẽ bị xóa để không phục vụ dữ liệu cũ.
+
+    Tham số:
+    path (str): Đường dẫn file JSON.
+    data (dict | list): Dữ liệu cần ghi.
+    minify (bool): Ghi JSON gọn (không thụt lề, không khoảng trắng), False thì thụt lề 2 như trước.
+    compress (bool): Tạo các bản nén .gz / .br.
+    """
+    if minify:
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    body = text.encode('utf-8')
+    atomic_write_bytes(path, body)
+
+    if compress:
+        # mtime=0 để cùng nội dung luôn cho cùng bản nén
+        atomic_write_bytes(path + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    else:
+        _remove(path + '.gz')
+    if compress and brotli is not None:
+        atomic_write_bytes(path + '.br', brotli.compress(body))
+    else:
+        _remove(path + '.br')
+    return len(body)
+
+
+def write_pages(result, pages_dir, page_size=20, minify=True, compress=True, author_count=4):
+    """
+    Chia bài viết (đã sắp xếp mới nhất trước) thành các trang page-1.json, page-2.json... trong pages_dir,
+    mỗi trang có cùng cấu trúc với /articles của server.py, kèm manifest.json mô tả số trang
+    và authors.json chứa author_count bài viết mới nhất của từng tác giả (thay cho /articles?author= khi không có server).
+    Các trang thừa của lần ghi trước bị xóa.
+
+    Trả về:
+    dict: Nội dung manifest.
+    """
+    articles = result.get('article_data', [])
+    statistical_data = result.get('statistical_data', {})
+    total = len(articles)
+    pages = max(1, math.ceil(total / page_size))
+    for page in range(1, pages + 1):
+        write_json(os.path.join(pages_dir, f'page-{page}.json'), {
+            'statistical_data': statistical_data,
+            'page': page,
+            'size': page_size,
+            'total': total,
+            'article_data': articles[(page - 1) * page_size:page * page_size]
+        }, minify, compress)
+
+    for path in glob.glob(os.path.join(pages_dir, 'page-*.json*')):
+        match = re.fullmatch(r'page-(\d+)\.json(?:\.gz|\.br)?', os.path.basename(path))
+        if match and int(match.group(1)) > pages:
+            _remove(path)
+
+    authors = {}
+    for article in articles:
+        author_articles = authors.setdefault(article.get('author', ''), [])
+        if len(author_articles) < author_count:
+            author_articles.append(article)
+    write_json(os.path.join(pages_dir, 'authors.json'), authors, minify, compress)
+
+    manifest = {
+        'statistical_data': statistical_data,
+        'size': page_size,
+        'total': total,
+        'pages': pages
+    }
+    write_json(os.path.join(pages_dir, 'manifest.json'), manifest, minify, compress)
+    return manifest
+
+
+def write_output(result, errors, output_dir='.', minify=True, compress=True, page_size=20, pages_dir='articles',
+                 latest_count=10):
+    """
+    Ghi toàn bộ dữ liệu tĩnh: all.json, errors.json, latest.json (latest_count bài viết mới nhất kèm thống kê,
+    để widget hiển thị ngay) và các trang trong pages_dir. Mọi file đều được ghi nguyên tử.
+
+    Tham số:
+    result (dict): Dữ liệu all.json.
+    errors (list): Dữ liệu errors.json.
+    output_dir (str): Thư mục ghi file.
+    minify (bool): Ghi JSON gọn.
+    compress (bool): Tạo bản nén sẵn .gz / .br.
+    page_size (int): Số bài viết mỗi trang, 0 hoặc None để không chia trang.
+    pages_dir (str): Thư mục chứa các trang, tương đối với output_dir.
+    latest_count (int): Số bài viết trong latest.json, 0 hoặc None để không ghi.
+    """
+    all_bytes = write_json(os.path.join(output_dir, 'all.json'), result, minify, compress)
+    write_json(os.path.join(output_dir, 'errors.json'), errors, minify, compress)
+    if latest_count:
+        write_json(os.path.join(output_dir, 'latest.json'), {
+            'statistical_data': result.get('statistical_data', {}),
+            'article_data': result.get('article_data', [])[:latest_count]
+        }, minify, compress)
+    if page_size:
+        manifest = write_pages(result, os.path.join(output_dir, pages_dir), page_size, minify, compress)
+        logging.info(f"Đã ghi all.json ({all_bytes} byte) và {manifest['pages']} trang vào {pages_dir}")
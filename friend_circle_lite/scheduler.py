@@ -0,0 +1,108 @@
+import os
+import statistics
+import threading
+import time
+
+from friend_circle_lite.cache import load_json_file, dump_json_file
+
+# Số mốc thời gian bài viết gần nhất được giữ lại cho mỗi feed để ước lượng tần suất đăng bài
+HISTORY_SIZE = 20
+
+
+class FeedScheduler:
+    """
+    Lịch thu thập thích ứng cho từng feed, lưu trong cache_dir/schedule.json để giữ qua các lần khởi động lại.
+
+    Mỗi feed có chu kỳ riêng, ước lượng từ khoảng cách trung vị giữa các bài viết gần đây (thu thập hai lần
+    trong một khoảng cách đó), giới hạn trong [min_interval, max_interval]. Feed bị lỗi được lùi lại theo
+    cấp số nhân min_interval * 2^số_lần_lỗi_liên_tiếp, tối đa max_interval.
+    """
+
+    def __init__(self, cache_dir=None, min_interval=1, max_interval=72, default_interval=12):
+        """
+        Tham số:
+        cache_dir (str): Thư mục lưu lịch, None thì chỉ giữ trong bộ nhớ.
+        min_interval (float): Chu kỳ nhỏ nhất (giờ).
+        max_interval (float): Chu kỳ lớn nhất (giờ).
+        default_interval (float): Chu kỳ (giờ) khi chưa đủ bài viết để ước lượng.
+        """
+        self.path = os.path.join(cache_dir, 'schedule.json') if cache_dir else None
+        self.min_interval = min_interval * 3600
+        self.max_interval = max_interval * 3600
+        self.default_interval = default_interval * 3600
+        self._lock = threading.Lock()
+        self._feeds = load_json_file(self.path)
+
+    def learn_interval(self, timestamps):
+        """
+        Ước lượng chu kỳ thu thập (giây) từ danh sách epoch của các bài viết.
+        """
+        timestamps = sorted({t for t in timestamps if t}, reverse=True)[:HISTORY_SIZE]
+        if len(timestamps) < 2:
+            return self.default_interval
+        gaps = [newer - older for newer, older in zip(timestamps, timestamps[1:])]
+        interval = statistics.median(gaps) / 2
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def due_friends(self, friends, now=None):
+        """
+        Lọc những bạn bè đã đến hạn thu thập (hoặc chưa có trong lịch).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return [
+                friend for friend in friends
+                if self._feeds.get(friend.get('link', ''), {}).get('next_due', 0) <= now
+            ]
+
+    def record_success(self, friend, articles, now=None):
+        """
+        Ghi nhận thu thập thành công: cập nhật lịch sử bài viết, ước lượng lại chu kỳ và đặt lần thu thập tiếp theo.
+        """
+        now = time.time() if now is None else now
+        link = friend.get('link', '')
+        with self._lock:
+            entry = self._feeds.get(link, {})
+            history = list(entry.get('history', [])) + [article.get('timestamp') for article in articles]
+            history = sorted({t for t in history if t}, reverse=True)[:HISTORY_SIZE]
+            interval = self.learn_interval(history)
+            self._feeds[link] = {
+                'history': history,
+                'interval': interval,
+                'failures': 0,
+                'last_crawled': now,
+                'next_due': now + interval
+            }
+
+    def record_failure(self, friend, now=None):
+        """
+        Ghi nhận thu thập thất bại và lùi lần thu thập tiếp theo theo cấp số nhân.
+        """
+        now = time.time() if now is None else now
+        link = friend.get('link', '')
+        with self._lock:
+            entry = dict(self._feeds.get(link, {}))
+            failures = entry.get('failures', 0) + 1
+            backoff = min(self.min_interval * 2 ** failures, self.max_interval)
+            entry.update({'failures': failures, 'next_due': now + backoff})
+            self._feeds[link] = entry
+
+    def next_wakeup(self):
+        """
+        Thời điểm (epoch) feed gần nhất đến hạn, None nếu lịch rỗng.
+        """
+        with self._lock:
+            due_times = [entry.get('next_due', 0) for entry in self._feeds.values()]
+        return min(due_times) if due_times else None
+
+    def save(self, friends=None):
+        """
+        Ghi lịch xuống đĩa. Nếu truyền danh sách bạn bè hiện tại thì bỏ lịch của các bạn bè đã bị xóa.
+        """
+        with self._lock:
+            if friends is not None:
+                links = {friend.get('link', '') for friend in friends}
+                self._feeds = {link: entry for link, entry in self._feeds.items() if link in links}
+            data = dict(self._feeds)
+        if self.path is not None:
+            dump_json_file(self.path, data)
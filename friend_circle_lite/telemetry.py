@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from friend_circle_lite.cache import dump_json_file
+
+# Số host chậm nhất được giữ lại trong phần tổng hợp
+SLOWEST_HOSTS = 10
+
+
+class _TimedConnectMixin:
+    """
+    Ghi lại thời gian thiết lập kết nối (phân giải tên miền + TCP + TLS) vào connect_time.
+    """
+    connect_time = None
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        self.connect_time = time.perf_counter() - start
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter dùng các kết nối có đo thời gian kết nối, xem pop_connect_time.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+def pop_connect_time(response):
+    """
+    Lấy thời gian kết nối (giây) của response dạng stream rồi xóa đi; kết nối được dùng lại (keep-alive)
+    không phải kết nối lại nên trả về 0.
+    """
+    connection = getattr(response.raw, 'connection', None)
+    connect_time = getattr(connection, 'connect_time', None)
+    if connect_time is not None:
+        connection.connect_time = None
+    return connect_time or 0.0
+
+
+def new_friend_stats():
+    """
+    Tạo bản ghi số liệu rỗng cho một bạn bè, được process_friend điền dần trong lúc thu thập.
+    """
+    return {
+        'feed_url': '',
+        'attempts': 0,
+        'http_status': None,
+        'connect': 0.0,
+        'ttfb': 0.0,
+        'bytes': 0,
+        'parse': 0.0,
+        'total': 0.0,
+        'articles': 0
+    }
+
+
+def _quantile(values, q):
+    """
+    Phân vị theo phương pháp nearest-rank, None nếu danh sách rỗng.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+class CrawlTelemetry:
+    """
+    Thu thập số liệu của từng bạn bè trong một lần chạy và ghi ra crawl_stats.json (kèm phần tổng hợp).
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(ZoneInfo("Asia/Shanghai")).strftime('%Y-%m-%d %H:%M:%S')
+        self._start = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+        self._friends = []
+
+    def record(self, friend, result):
+        """
+        Ghi nhận kết quả process_friend của một bạn bè (result là None nếu xử lý gặp lỗi).
+        """
+        stats = dict(result.get('stats') or new_friend_stats()) if result is not None else new_friend_stats()
+        link = friend.get('link', '')
+        entry = {
+            'name': friend.get('name', ''),
+            'link': link,
+            'host': urlparse(link).netloc,
+            'status': result['status'] if result is not None else 'exception',
+            'error': result.get('error') if result is not None else 'exception',
+        }
+        entry.update(stats)
+        with self._lock:
+            self._friends.append(entry)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def summary(self):
+        """
+        Tổng hợp số liệu của lần chạy: số bạn bè theo trạng thái, tổng request và byte,
+        phân vị p50/p95 của từng giai đoạn và các host chậm nhất.
+        """
+        with self._lock:
+            friends = list(self._friends)
+        statuses = {}
+        for entry in friends:
+            statuses[entry['status']] = statuses.get(entry['status'], 0) + 1
+        latency = {}
+        for phase in ('connect', 'ttfb', 'parse', 'total'):
+            values = [entry[phase] for entry in friends if entry['attempts']]
+            latency[phase] = {'p50': _quantile(values, 0.5), 'p95': _quantile(values, 0.95)}
+        slowest = sorted(friends, key=lambda entry: entry['total'], reverse=True)[:SLOWEST_HOSTS]
+        return {
+            'started_at': self.started_at,
+            'duration': self.duration if self.duration is not None else time.perf_counter() - self._start,
+            'friends': len(friends),
+            'statuses': statuses,
+            'requests': sum(entry['attempts'] for entry in friends),
+            'bytes': sum(entry['bytes'] for entry in friends),
+            'articles': sum(entry['articles'] for entry in friends),
+            'latency': latency,
+            'slowest_hosts': [
+                {'host': entry['host'], 'total': entry['total'], 'bytes': entry['bytes'], 'status': entry['status']}
+                for entry in slowest
+            ]
+        }
+
+    def save(self, path):
+        with self._lock:
+            friends = sorted(self._friends, key=lambda entry: entry['total'], reverse=True)
+        dump_json_file(path, {'summary': self.summary(), 'friends': friends})
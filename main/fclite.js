@@ -5,6 +5,8 @@ function initialize_fc_lite() {
     UserConfig = {
         private_api_url: UserConfig?.private_api_url || "", 
         page_turning_number: UserConfig?.page_turning_number || 20, // Mặc định 20 bài
+        api_mode: UserConfig?.api_mode || "all", // "all": tải toàn bộ all.json; "paged": tải từng trang qua /articles (cần server.py); "static": tải từng trang tĩnh pages_dir/page-N.json
+        pages_dir: UserConfig?.pages_dir || "articles", // Thư mục trang tĩnh, trùng với output.pages_dir trong conf.yaml
         error_img: UserConfig?.error_img || "https://fastly.jsdelivr.net/gh/willow-god/Friend-Circle-Lite@latest/static/favicon.ico" // Avatar mặc định
     };
 
@@ -36,8 +38,15 @@ function initialize_fc_lite() {
 
     let start = 0; // Ghi lại vị trí bắt đầu tải
     let allArticles = []; // Lưu trữ tất cả bài viết
+    let nextPage = 1; // Trang tiếp theo cần tải ở chế độ paged
+    let authorArticles = null; // Bài viết theo tác giả (authors.json) ở chế độ static, chỉ tải khi mở modal lần đầu
 
     function loadMoreArticles() {
+        if (UserConfig.api_mode === 'paged' || UserConfig.api_mode === 'static') {
+            loadArticlePage();
+            return;
+        }
+
         const cacheKey = 'friend-circle-lite-cache';
         const cacheTimeKey = 'friend-circle-lite-cache-time';
         const cacheTime = localStorage.getItem(cacheTimeKey);
@@ -63,21 +72,58 @@ function initialize_fc_lite() {
             });
     }
 
-    function processArticles(data) {
-        allArticles = data.article_data;
-        // Xử lý dữ liệu thống kê
-        const stats = data.statistical_data;
+    // Chế độ paged / static: mỗi lần chỉ tải một trang (từ server hoặc file trang tĩnh), không tải toàn bộ dữ liệu
+    function loadArticlePage() {
+        const pageUrl = UserConfig.api_mode === 'static'
+            ? `${UserConfig.private_api_url}${UserConfig.pages_dir}/page-${nextPage}.json` // Kích thước trang do output.page_size quyết định
+            : `${UserConfig.private_api_url}articles?page=${nextPage}&size=${UserConfig.page_turning_number}`;
+        fetch(pageUrl)
+            .then(response => response.json())
+            .then(data => {
+                const isFirstPage = nextPage === 1;
+                nextPage += 1;
+                allArticles = allArticles.concat(data.article_data);
+                renderStats(data.statistical_data);
+                if (isFirstPage && allArticles.length) {
+                    displayRandomArticle();
+                }
+                renderArticles(data.article_data);
+                if (allArticles.length >= data.total) {
+                    loadMoreBtn.style.display = 'none'; // Ẩn nút
+                }
+            })
+            .finally(() => {
+                loadMoreBtn.innerText = 'Thêm nữa'; // Khôi phục văn bản nút
+            });
+    }
+
+    function renderStats(stats) {
         statsContainer.innerHTML = `
             <div>Powered by: <a href="https://www.facebook.com/thinhem.ic" target="_blank">Phung Duy Thinh</a><br></div>
             <div>Designed By: <a href="https://blog.inlove.eu.org" target="_blank">.Thinhem</a><br></div>
             <div>Subscribe:${stats.friends_num}   Active:${stats.active_num}   Total articles:${stats.article_num}<br></div>
             <div>Update time:${stats.last_updated_time}</div>
         `;
+    }
+
+    function processArticles(data) {
+        allArticles = data.article_data;
+        // Xử lý dữ liệu thống kê
+        renderStats(data.statistical_data);
 
         displayRandomArticle(); // Hiển thị thẻ bạn bè ngẫu nhiên
 
         const articles = allArticles.slice(start, start + UserConfig.page_turning_number);
+        renderArticles(articles);
 
+        start += UserConfig.page_turning_number;
+
+        if (start >= allArticles.length) {
+            loadMoreBtn.style.display = 'none'; // Ẩn nút
+        }
+    }
+
+    function renderArticles(articles) {
         articles.forEach(article => {
             const card = document.createElement('div');
             card.className = 'card';
@@ -115,12 +161,6 @@ function initialize_fc_lite() {
 
             container.appendChild(card);
         });
-
-        start += UserConfig.page_turning_number;
-
-        if (start >= allArticles.length) {
-            loadMoreBtn.style.display = 'none'; // Ẩn nút
-        }
     }
 
     // Logic hiển thị bài viết ngẫu nhiên
@@ -177,7 +217,32 @@ function initialize_fc_lite() {
         modalAuthorNameLink.innerText = author;
         modalAuthorNameLink.href = new URL(link).origin;
 
-        const authorArticles = allArticles.filter(article => article.author === author);
+        if (UserConfig.api_mode === 'static') {
+            // Chế độ static không có server, bài viết của tác giả lấy từ authors.json cạnh các trang tĩnh
+            const authorsPromise = authorArticles
+                ? Promise.resolve(authorArticles)
+                : fetch(`${UserConfig.private_api_url}${UserConfig.pages_dir}/authors.json`)
+                    .then(response => response.json())
+                    .then(data => authorArticles = data);
+            authorsPromise.then(data => renderAuthorArticles(data[author] || []));
+        } else if (UserConfig.api_mode === 'paged') {
+            // Chế độ paged chỉ có một phần bài viết ở client, lấy bài viết của tác giả từ server
+            fetch(`${UserConfig.private_api_url}articles?author=${encodeURIComponent(author)}&size=4`)
+                .then(response => response.json())
+                .then(data => renderAuthorArticles(data.article_data));
+        } else {
+            renderAuthorArticles(allArticles.filter(article => article.author === author));
+        }
+
+        // Đặt tên lớp để kích hoạt hiệu ứng hiển thị
+        modal.style.display = 'block';
+        setTimeout(() => {
+            modal.classList.add('modal-open');
+        }, 10); // Đảm bảo hiệu ứng hiển thị được kích hoạt
+    }
+
+    function renderAuthorArticles(authorArticles) {
+        const modalArticlesContainer = document.getElementById('modal-articles-container');
         // Chỉ lấy năm bài đầu tiên, ngăn modal quá dài do quá nhiều bài viết, nếu không đủ năm thì lấy tất cả
         authorArticles.slice(0, 4).forEach(article => {
             const articleDiv = document.createElement('div');
@@ -197,12 +262,6 @@ function initialize_fc_lite() {
 
             modalArticlesContainer.appendChild(articleDiv);
         });
-
-        // Đặt tên lớp để kích hoạt hiệu ứng hiển thị
-        modal.style.display = 'block';
-        setTimeout(() => {
-            modal.classList.add('modal-open');
-        }, 10); // Đảm bảo hiệu ứng hiển thị được kích hoạt
     }
 
     // Hàm ẩn modal
@@ -1,7 +1,13 @@
 import logging
+import queue
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 from jinja2 import Environment, FileSystemLoader
 import os
 
@@ -32,36 +38,252 @@ def email_sender(
     template_data (dict): 渲染模板的数据。默认为 None。
     use_tls (bool): 是否使用 TLS 加密。默认为 True。
     """
+    msg = build_message(target_email, sender_email, subject, body, template_path, template_data)
+
+    # 连接到 SMTP 服务器并发送邮件
+    try:
+        with smtplib.SMTP(smtp_server, port) as server:
+            if use_tls:
+                server.starttls()  # 启动安全模式
+            server.login(sender_email, password)
+            server.sendmail(sender_email, target_email, msg.as_string())
+            print(f'邮件已发送到 {target_email}')
+    except Exception as e:
+        logging.error(f'邮件发送失败，目标地址: {target_email}，错误信息: {e}')
+
+@lru_cache(maxsize=None)
+def _template_environment(template_dir):
+    """
+    每个模板目录只创建一次 Jinja2 Environment。Environment 自带已编译模板的缓存，
+    模板文件修改后会自动重新编译，因此常驻运行时也不会用到过期的模板。
+    """
+    return Environment(loader=FileSystemLoader(template_dir))
+
+def render_template(template_path, template_data):
+    """
+    使用缓存的 Environment 渲染 HTML 模板，模板在一次运行中只编译一次。
+    """
+    env = _template_environment(os.path.dirname(template_path))
+    return env.get_template(os.path.basename(template_path)).render(template_data)
+
+def build_message(target_email, sender_email, subject, body, template_path=None, template_data=None):
+    """
+    构建邮件 MIME 对象，提供模板时使用 Jinja2 渲染 HTML 正文，否则使用纯文本正文。
+    target_email 为 None 时不设置 To 头。
+    """
     # 创建 MIME 对象
     msg = MIMEMultipart()
     msg['From'] = sender_email
-    msg['To'] = target_email
+    if target_email is not None:
+        msg['To'] = target_email
     msg['Subject'] = subject
 
     if template_path and template_data:
         # 使用 Jinja2 渲染 HTML 模板
-        env = Environment(loader=FileSystemLoader(os.path.dirname(template_path)))
-        template = env.get_template(os.path.basename(template_path))
-        html_content = template.render(template_data)
-        msg.attach(MIMEText(html_content, 'html'))
+        msg.attach(MIMEText(render_template(template_path, template_data), 'html'))
     else:
         # 添加纯文本邮件内容
         msg.attach(MIMEText(body, 'plain'))
+    return msg
 
-    # 连接到 SMTP 服务器并发送邮件
-    try:
-        with smtplib.SMTP(smtp_server, port) as server:
-            if use_tls:
+# 与 MIMEMultipart 默认的 compat32 策略一致（非 ASCII 头部按 RFC 2047 编码），只是换行改为 CRLF
+SMTP_POLICY = policy.compat32.clone(linesep='\r\n')
+
+class PreparedMessage:
+    """
+    预先渲染并序列化的邮件：模板渲染和 MIME 编码只做一次，
+    发送给每个收件人时只在共享的字节前面加上该收件人的 To 头。
+    """
+
+    def __init__(self, sender_email, subject, body, template_path=None, template_data=None):
+        self.subject = subject
+        msg = build_message(None, sender_email, subject, body, template_path, template_data)
+        # 按 CRLF 换行序列化，smtplib 发送字节时不会再转换换行符
+        self.payload = msg.as_bytes(policy=SMTP_POLICY)
+
+    def for_recipient(self, target_email):
+        """
+        返回发给 target_email 的完整邮件字节。
+        """
+        return SMTP_POLICY.fold_binary('To', target_email) + self.payload
+
+def _is_transient(error):
+    """
+    判断发送错误是否可以重连重试：连接断开、网络错误以及 4xx 临时错误可以重试，5xx 永久错误和认证失败不重试。
+    """
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+class RateLimiter:
+    """
+    线程安全的发送速率限制器，保证所有连接合计每秒发送不超过 rate 封邮件。
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class SMTPConnection:
+    """
+    一个持久的、已认证的 SMTP 连接，首次发送时才建立连接，断开后在下次发送时自动重连。
+    """
+
+    def __init__(self, smtp_server, port, sender_email, password, use_tls=True, timeout=30):
+        self.smtp_server = smtp_server
+        self.port = port
+        self.sender_email = sender_email
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
                 server.starttls()  # 启动安全模式
-            server.login(sender_email, password)
-            server.sendmail(sender_email, target_email, msg.as_string())
-            print(f'邮件已发送到 {target_email}')
-    except Exception as e:
-        logging.error(f'邮件发送失败，目标地址: {target_email}，错误信息: {e}')
+            server.login(self.sender_email, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def send(self, target_email, message):
+        """
+        通过该连接发送一封邮件，message 为已序列化的邮件字符串或字节。
+        """
+        if self._server is None:
+            self._connect()
+        self._server.sendmail(self.sender_email, target_email, message)
+
+    def reset(self):
+        """
+        丢弃当前连接（出错后调用），下次发送时重新连接和登录。
+        """
+        if self._server is not None:
+            try:
+                self._server.close()
+            finally:
+                self._server = None
 
-def send_emails(emails, sender_email, smtp_server, port, password, subject, body, template_path=None, template_data=None, use_tls=True):
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            finally:
+                self.reset()
+
+class SMTPPool:
+    """
+    SMTP 发送引擎：维护最多 pool_size 个持久的已认证连接，跨多次 send 调用复用，
+    并行发送、全局限速，遇到临时错误时重连并有限次重试，最后返回每个收件人的发送结果。
+    """
+
+    def __init__(self, smtp_server, port, sender_email, password, use_tls=True, pool_size=3, rate_limit=None,
+                 max_retries=3, retry_backoff=1.0):
+        """
+        参数：
+        smtp_server (str): SMTP 服务地址。
+        port (int): SMTP 服务端口。
+        sender_email (str): 发信邮箱地址。
+        password (str): SMTP 服务密码。
+        use_tls (bool): 是否使用 TLS 加密。
+        pool_size (int): 并行连接数量上限。
+        rate_limit (float): 所有连接合计每秒最多发送的邮件数，None 表示不限速。
+        max_retries (int): 临时错误时的最大重试次数。
+        retry_backoff (float): 第一次重试前等待的秒数，之后每次翻倍。
+        """
+        self.sender_email = sender_email
+        self.pool_size = max(1, pool_size)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.rate_limiter = RateLimiter(rate_limit)
+        self._connections = queue.LifoQueue()
+        for _ in range(self.pool_size):
+            self._connections.put(SMTPConnection(smtp_server, port, sender_email, password, use_tls))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, messages):
+        """
+        并行发送一批邮件。
+
+        参数：
+        messages (list): (收件人地址, 邮件) 列表，邮件可以是 PreparedMessage、MIME 对象、字符串或字节。
+
+        返回：
+        list: 每封邮件的发送结果 {'email', 'subject', 'ok', 'attempts', 'error'}，顺序与 messages 一致。
+        """
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(lambda item: self._deliver(*item), messages))
+
+    def _deliver(self, target_email, message):
+        if isinstance(message, PreparedMessage):
+            subject, payload = message.subject, message.for_recipient(target_email)
+        elif hasattr(message, 'as_string'):
+            subject, payload = message['Subject'], message.as_string()
+        else:
+            subject, payload = None, message
+        connection = self._connections.get()
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                self.rate_limiter.wait()
+                try:
+                    connection.send(target_email, payload)
+                    logging.info(f'邮件已发送到 {target_email}')
+                    return {'email': target_email, 'subject': subject, 'ok': True, 'attempts': attempt, 'error': None}
+                except Exception as e:
+                    # 服务器明确拒绝时连接仍可用（smtplib 已发送 RSET），其余错误丢弃连接以便重连
+                    if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        connection.reset()
+                    if attempt > self.max_retries or not _is_transient(e):
+                        logging.error(f'邮件发送失败，目标地址: {target_email}，错误信息: {e}')
+                        return {'email': target_email, 'subject': subject, 'ok': False, 'attempts': attempt,
+                                'error': f'{type(e).__name__}: {e}'}
+                    logging.warning(f'邮件发送到 {target_email} 时出现临时错误，第 {attempt} 次重试: {e}')
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        """
+        关闭所有连接。
+        """
+        while True:
+            try:
+                connection = self._connections.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+
+def send_emails(emails, sender_email, smtp_server, port, password, subject, body, template_path=None, template_data=None,
+                use_tls=True, pool=None, pool_size=3, rate_limit=None, max_retries=3):
     """
-    循环发送邮件给指定的多个邮箱。
+    发送邮件给指定的多个邮箱，复用已认证的 SMTP 连接并行发送。
 
     参数：
     emails (list): 包含目标邮箱地址的列表。
@@ -74,7 +296,29 @@ def send_emails(emails, sender_email, smtp_server, port, password, subject, body
     template_path (str): HTML 模板文件路径。默认为 None。
     template_data (dict): 渲染模板的数据。默认为 None。
     use_tls (bool): 是否使用 TLS 加密。默认为 True。
+    pool (SMTPPool): 已有的发送引擎，多次调用时传入以复用连接；为 None 时临时创建并在发送后关闭。
+    pool_size (int): 临时创建发送引擎时的并行连接数。
+    rate_limit (float): 临时创建发送引擎时每秒最多发送的邮件数。
+    max_retries (int): 临时创建发送引擎时临时错误的最大重试次数。
+
+    返回：
+    list: 每个收件人的发送结果，见 SMTPPool.send。
     """
+    # 同一篇文章的所有收件人共用一份渲染并序列化好的邮件
+    message = PreparedMessage(sender_email, subject, body, template_path, template_data)
+    messages = []
     for email in emails:
         logging.info(f'正在发送邮件到 {email}，邮件内容: {subject}')
-        email_sender(email, sender_email, smtp_server, port, password, subject, body, template_path, template_data, use_tls)
\ No newline at end of file
+        messages.append((email, message))
+
+    if pool is not None:
+        results = pool.send(messages)
+    else:
+        with SMTPPool(smtp_server, port, sender_email, password, use_tls, pool_size, rate_limit, max_retries) as pool:
+            results = pool.send(messages)
+
+    failed = [result['email'] for result in results if not result['ok']]
+    logging.info(f'邮件发送完成，成功 {len(results) - len(failed)} 封，失败 {len(failed)} 封')
+    if failed:
+        logging.warning(f'发送失败的邮箱: {failed}')
+    return results
\ No newline at end of file
@@ -1,7 +1,9 @@
 import logging
 import requests
 import re
+from concurrent.futures import ThreadPoolExecutor
 from friend_circle_lite.get_info import check_feed, parse_feed
+from friend_circle_lite.cache import FeedCache, feed_registry, load_json_file, dump_json_file
 import json
 import os
 
@@ -17,89 +19,265 @@ HEADERS_JSON = {
 }
 
 
-def extract_emails_from_issues(api_url):
+SUBSCRIBE_PATTERN = re.compile(r'^\[邮箱订阅\](.+)$')
+UNSUBSCRIBE_PATTERN = re.compile(r'^\[取消订阅\](.+)$')
+
+def _github_get(session, url, headers, params=None):
+    response = session.get(url, headers=headers, params=params, timeout=10)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+def _page_number(url):
+    """
+    从 GitHub 分页链接中取出 page 参数。
+    """
+    match = re.search(r'[?&]page=(\d+)', url)
+    return int(match.group(1)) if match else None
+
+def _issue_action(issue):
+    """
+    解析 issue 的订阅动作。
+
+    返回：
+    dict: {'action': 'subscribe' 或 'unsubscribe', 'email': 邮箱, 'user': 提交者}，不是有效的订阅或退订 issue 时返回 None。
+    订阅 issue 需已关闭且带有 subscribed 标签（由 deal_subscribe_issue 工作流处理）。
+    """
+    if 'pull_request' in issue:
+        return None
+    title = (issue.get('title') or '').strip()
+    user = ((issue.get('user') or {}).get('login') or '').lower()
+    match = UNSUBSCRIBE_PATTERN.match(title)
+    if match:
+        return {'action': 'unsubscribe', 'email': match.group(1).strip(), 'user': user}
+    match = SUBSCRIBE_PATTERN.match(title)
+    if not match:
+        return None
+    labels = {label.get('name') if isinstance(label, dict) else label for label in issue.get('labels', [])}
+    if issue.get('state') != 'closed' or 'subscribed' not in labels:
+        return None
+    return {'action': 'subscribe', 'email': match.group(1).strip(), 'user': user}
+
+def _parse_page(issues):
     """
-    从GitHub issues API中提取以[e-mail]开头的title中的邮箱地址。
+    将一页 issue 转换为缓存的页面记录：{'count': 该页 issue 数, 'issues': {编号: 订阅动作}}。
+    """
+    records = {}
+    for issue in issues:
+        action = _issue_action(issue)
+        if action is not None:
+            records[str(issue.get('number'))] = action
+    return {'count': len(issues), 'issues': records}
+
+def _fetch_page(session, api_url, headers, params, page, cached=None):
+    """
+    获取一页 issue。有上次的 ETag 时发送条件请求，页面没有变化时 GitHub 返回 304（不计入速率限制），直接使用缓存。
+
+    返回：
+    tuple: (页面记录, 是否有变化, response)。
+    """
+    page_headers = dict(headers, **{'If-None-Match': cached['etag']}) if cached and cached.get('etag') else headers
+    response = _github_get(session, api_url, page_headers, dict(params, page=page))
+    if response.status_code == 304:
+        return cached, False, response
+    record = _parse_page(response.json())
+    record['etag'] = response.headers.get('ETag')
+    return record, True, response
+
+def _fetch_issue_pages(session, api_url, headers, params, cached_pages=(), max_workers=4):
+    """
+    按创建时间顺序分页获取全部 issue，每页都带上次的 ETag 发送条件请求。
+
+    先请求第一页，从 rel="last"（第一页没有变化时使用上次的页数）得到总页数后并发请求其余页面；
+    最后一页已满时继续向后获取，直到遇到未满的页。因为按创建时间排序，新 issue 只会改变最后几页，
+    删除的 issue 则会改变其所在页及之后的页，所以每次运行都能发现删除，而未变化的页只消耗一次 304。
+
+    返回：
+    tuple: (本次每页的记录列表, 有变化的页数)。
+    """
+    cached_pages = list(cached_pages)
+
+    def cached_at(page):
+        return cached_pages[page - 1] if page <= len(cached_pages) else None
+
+    first, changed, response = _fetch_page(session, api_url, headers, params, 1, cached_at(1))
+    if changed:
+        last = response.links.get('last', {}).get('url')
+        last_page = _page_number(last) if last else 1
+    else:
+        last_page = max(1, len(cached_pages))
+    pages = [first]
+    changed_pages = int(changed)
+    if last_page > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for record, page_changed, _ in executor.map(
+                lambda page: _fetch_page(session, api_url, headers, params, page, cached_at(page)),
+                range(2, last_page + 1)
+            ):
+                pages.append(record)
+                changed_pages += page_changed
+    # 最后一页已满时之后可能还有新的页面
+    while pages[-1]['count'] >= params['per_page']:
+        record, page_changed, _ = _fetch_page(session, api_url, headers, params, len(pages) + 1,
+                                              cached_at(len(pages) + 1))
+        pages.append(record)
+        changed_pages += page_changed
+    # 删除 issue 后末尾可能出现空页
+    while len(pages) > 1 and not pages[-1]['count']:
+        pages.pop()
+    return pages, changed_pages
+
+def _active_emails(pages):
+    """
+    根据各页的 issue 记录计算当前订阅的邮箱：同一邮箱（不区分大小写）以编号最大的 issue 为准，
+    即之后提交的退订会取消之前的订阅，之后重新订阅又会恢复。退订 issue 只有在提交者与当前订阅 issue 的
+    提交者相同时才生效，防止他人替别人退订。
+    """
+    issues = {}
+    for page in pages:
+        issues.update(page['issues'])
+    latest = {}
+    for number, record in sorted(issues.items(), key=lambda item: int(item[0])):
+        key = record['email'].lower()
+        if record['action'] == 'unsubscribe':
+            current = latest.get(key)
+            if current is None or current['action'] != 'subscribe' or current.get('user') != record.get('user'):
+                continue
+        latest[key] = record
+    return [record['email'] for record in latest.values() if record['action'] == 'subscribe']
+
+def extract_emails_from_issues(api_url, token=None, state_path=None, max_workers=4, session=None):
+    """
+    从GitHub issues API中提取以[邮箱订阅]开头的title中的邮箱地址，并处理以[取消订阅]开头的退订 issue。
+
+    每次运行都按创建时间分页获取全部 issue（每页 100 条，见 _fetch_issue_pages），因此删除订阅 issue
+    在下一次运行时即生效。提供 state_path 时保存每页的 ETag 和解析后的订阅记录，未变化的页面以条件请求
+    获取，GitHub 返回 304 且不计入速率限制。
 
     参数：
-    api_url (str): GitHub issues API的URL。
+    api_url (str): GitHub issues API的URL，如 https://api.github.com/repos/{用户名}/{仓库名}/issues，查询参数会被忽略。
+    token (str): GitHub token，用于提高速率限制。默认为 None。
+    state_path (str): 订阅状态缓存文件路径，None 时不使用条件请求。
+    max_workers (int): 并发请求分页的线程数。
+    session (requests.Session): 复用的会话，None 时临时创建。
 
     返回：
-    dict: 包含所有提取的邮箱地址的字典。
+    dict: 包含所有提取的邮箱地址的字典，获取失败且没有缓存时返回 None。
     {
         "emails": [
             "3162475700@qq.com"
         ]
     }
     """
+    api_url = api_url.split('?', 1)[0]
+    headers = dict(HEADERS_JSON, Accept='application/vnd.github+json')
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    state = load_json_file(state_path)
+    if state.get('api_url') != api_url or 'pages' not in state:
+        state = {}
+    cached_pages = state.get('pages', [])
+    params = {'state': 'all', 'sort': 'created', 'direction': 'asc', 'per_page': 100}
+
+    owns_session = session is None
+    session = session or requests.Session()
     try:
-        response = requests.get(api_url, headers=HEADERS_JSON, timeout=10)
-        response.raise_for_status()
-        issues = response.json()
+        pages, changed_pages = _fetch_issue_pages(session, api_url, headers, params, cached_pages, max_workers)
     except Exception as e:
         logging.error(f"无法获取 GitHub issues 数据，错误信息: {e}")
-        return None
+        return {"emails": _active_emails(cached_pages)} if state else None
+    finally:
+        if owns_session:
+            session.close()
 
-    email_pattern = re.compile(r'^\[邮箱订阅\](.+)$')
-    emails = []
+    if not changed_pages and len(pages) == len(cached_pages):
+        logging.info("GitHub issues 自上次获取后没有变化，使用缓存的订阅列表")
+    else:
+        logging.info(f"获取了 {len(pages)} 页 issue，其中 {changed_pages} 页有变化")
+        if state_path:
+            dump_json_file(state_path, {'api_url': api_url, 'pages': pages})
+    return {"emails": _active_emails(pages)}
 
-    for issue in issues:
-        title = issue.get("title", "")
-        match = email_pattern.match(title)
-        if match:
-            email = match.group(1).strip()
-            emails.append(email)
+# 上次文章链接集合，按文件路径缓存在内存中，常驻运行时不必每轮重新读取文件
+_last_links = {}
 
-    return {"emails": emails}
+def _load_last_links(path):
+    if path not in _last_links:
+        links = set()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    links = {article['link'] for article in json.load(file).get('articles', [])}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.warning(f"无法读取 {path}，视为没有上次的文章数据: {e}")
+        _last_links[path] = links
+    return _last_links[path]
 
-def get_latest_articles_from_link(url, count=5, last_articles_path="./rss_subscribe/last_articles.json"):
+def _fetch_latest_articles(url, count, cache_dir=None, session=None):
     """
-    从指定链接获取最新的文章数据并与本地存储的上次的文章数据进行对比。
+    自行检查并解析博客的 feed。提供 cache_dir 时使用 FeedCache 发送条件请求，feed 没有变化时服务器返回 304，
+    直接使用上次解析的结果。
+
+    返回：
+    list: 文章列表，无法获取时返回 None。
+    """
+    cache = FeedCache(cache_dir, namespace='rss_subscribe') if cache_dir else None
+    owns_session = session is None
+    session = session or requests.Session()
+    try:
+        feed_type, feed_url = check_feed({'link': url}, session, cache)
+        if feed_type == 'none':
+            return None
+        latest_data = parse_feed(feed_url, session, count, url, cache)
+    finally:
+        if owns_session:
+            session.close()
+    if cache is not None:
+        cache.save()
+    return latest_data['articles']
+
+def get_latest_articles_from_link(url, count=5, last_articles_path="./rss_subscribe/last_articles.json",
+                                  cache_dir=None, session=None):
+    """
+    获取指定博客的最新文章并与上次的文章数据进行对比。
+
+    如果该博客在本进程刚刚运行的抓取中已经被解析过（见 feed_registry），直接使用抓取结果；
+    否则自行获取 feed（提供 cache_dir 时为条件请求）。上次的文章链接集合保存在内存中，
+    只在文章列表变化时写回 last_articles_path。
 
     参数：
     url (str): 用于获取文章数据的链接。
     count (int): 获取文章数的最大数。如果小于则全部获取，如果文章数大于则只取前 count 篇文章。
+    last_articles_path (str): 上次文章数据的保存路径。
+    cache_dir (str): feed 缓存目录，自行获取时用于条件请求，None 时不使用缓存。
+    session (requests.Session): 自行获取时复用的会话，None 时临时创建。
 
     返回：
     list: 更新的文章列表，如果没有更新的文章则返回 None。
     """
-    # 本地存储上次文章数据的文件
-    local_file = last_articles_path
-    
-    # 检查和解析 feed
-    session = requests.Session()
-    feed_type, feed_url = check_feed(url, session)
-    if feed_type == 'none':
-        logging.error(f"无法获取 {url} 的文章数据")
-        return None
-
-    # 获取最新的文章数据
-    latest_data = parse_feed(feed_url, session ,count)
-    latest_articles = latest_data['articles']
-    
-    # 读取本地存储的上次的文章数据
-    if os.path.exists(local_file):
-        with open(local_file, 'r', encoding='utf-8') as file:
-            last_data = json.load(file)
+    registered = feed_registry.lookup(url, count, need_summary=True)
+    if registered is not None:
+        logging.info(f"使用本次抓取中 {url} 的 feed 结果，不再重复请求")
+        latest_articles = registered['result']['articles'][:count]
     else:
-        last_data = {'articles': []}
-    
-    last_articles = last_data['articles']
-
-    # 找到更新的文章
-    updated_articles = []
-    last_titles = {article['link'] for article in last_articles}
-
-    for article in latest_articles:
-        if article['link'] not in last_titles:
-            updated_articles.append(article)
-    
+        latest_articles = _fetch_latest_articles(url, count, cache_dir, session)
+        if latest_articles is None:
+            logging.error(f"无法获取 {url} 的文章数据")
+            return None
+
+    last_links = _load_last_links(last_articles_path)
+    updated_articles = [article for article in latest_articles if article['link'] not in last_links]
+
     logging.info(f"从 {url} 获取到 {len(latest_articles)} 篇文章，其中 {len(updated_articles)} 篇为新文章")
 
-    # 更新本地存储的文章数据
-    with open(local_file, 'w', encoding='utf-8') as file:
-        json.dump({'articles': latest_articles}, file, ensure_ascii=False, indent=4)
-    
+    # 文章列表变化时才更新本地存储的文章数据
+    latest_links = {article['link'] for article in latest_articles}
+    if latest_links != last_links:
+        os.makedirs(os.path.dirname(last_articles_path) or '.', exist_ok=True)
+        with open(last_articles_path, 'w', encoding='utf-8') as file:
+            json.dump({'articles': latest_articles}, file, ensure_ascii=False, indent=4)
+        _last_links[last_articles_path] = latest_links
+
     # 如果有更新的文章，返回这些文章，否则返回 None
     return updated_articles if updated_articles else None
-
@@ -1,73 +1,193 @@
+import argparse
 import logging
 import json
-import sys
 import os
+import time
 
 from friend_circle_lite.get_info import (
     fetch_and_process_data,
+    create_parse_pool,
     marge_data_from_json_url,
     marge_errors_from_json_url,
-    deal_with_large_data
+    deal_with_large_data,
+    strip_internal_fields,
+    create_session
 )
 from friend_circle_lite.get_conf import load_config
+from friend_circle_lite.cache import FeedCache
+from friend_circle_lite.incremental import load_snapshot
+from friend_circle_lite.article_store import ArticleStore, store_crawl_result
+from friend_circle_lite.scheduler import FeedScheduler
+from friend_circle_lite.health import HealthStore
+from friend_circle_lite.telemetry import CrawlTelemetry
+from friend_circle_lite.digest import DigestIndex
+from friend_circle_lite.output import write_output
 from rss_subscribe.push_article_update import (
     get_latest_articles_from_link,
     extract_emails_from_issues
 )
-from push_rss_update.send_email import send_emails
+from push_rss_update.send_email import send_emails, SMTPPool
 
 # ========== Cài đặt logging ==========
+LOG_FORMAT = '😋 %(levelname)s: %(message)s'
 logging.basicConfig(
     level=logging.INFO,
-    format='😋 %(levelname)s: %(message)s'
+    format=LOG_FORMAT
 )
 
-# ========== Tải cấu hình ==========
-config = load_config("./conf.yaml")
-
 # ========== Module crawler ==========
-if config["spider_settings"]["enable"]:
+def create_health_store(config):
+    """
+    Tạo hồ sơ sức khỏe (cầu dao cho blog chết) theo cấu hình, None nếu chưa bật.
+    """
+    health_conf = config['spider_settings'].get('health', {})
+    if not health_conf.get('enable'):
+        return None
+    return HealthStore(
+        path=health_conf.get('path', './cache/health.json'),
+        failure_threshold=health_conf.get('failure_threshold', 3),
+        probe_interval=health_conf.get('probe_interval', 24),
+        max_probe_interval=health_conf.get('max_probe_interval', 168)
+    )
+
+def run_spider(config, session=None, scheduler=None, baseline=None, health=None, parse_pool=None):
+    """
+    Thu thập bài viết của bạn bè và ghi ra all.json / errors.json.
+
+    Tham số:
+    config (dict): Cấu hình đã tải từ conf.yaml.
+    session (requests.Session): Session dùng lại giữa các chu kỳ (chế độ daemon).
+    scheduler (FeedScheduler): Lịch thu thập thích ứng (chế độ daemon).
+    baseline (tuple): (result, errors) làm dữ liệu nền; None thì đọc từ file khi bật chế độ tăng dần.
+    health (HealthStore): Hồ sơ sức khỏe dùng lại giữa các chu kỳ; None thì tạo theo cấu hình.
+    parse_pool (ProcessPoolExecutor): Pool phân tích feed dùng lại giữa các chu kỳ; None thì tạo theo cấu hình
+                                      và đóng lại sau khi thu thập xong.
+
+    Trả về:
+    tuple: (result, lost_friends) đã ghi ra file, None nếu không lấy được danh sách bạn bè.
+    """
     logging.info("✅ Crawler đã được kích hoạt")
 
     json_url = config['spider_settings']['json_url']
     article_count = config['spider_settings']['article_count']
     specific_rss = config['specific_RSS']
+    cache_conf = config['spider_settings'].get('cache', {})
+    cache_dir = cache_conf.get('cache_dir', './cache') if cache_conf.get('enable') else None
+    crawl_conf = config['spider_settings'].get('crawl', {})
+    parse_conf = config['spider_settings'].get('parse', {})
+    incremental_conf = config['spider_settings'].get('incremental', {})
+    health_conf = config['spider_settings'].get('health', {})
+    if health is None:
+        health = create_health_store(config)
+    telemetry = CrawlTelemetry() if config['spider_settings'].get('telemetry', {}).get('enable') else None
+
+    if baseline is None and (incremental_conf.get('enable') or scheduler is not None):
+        baseline = load_snapshot("./all.json", "./errors.json")
+        if baseline[0] is None:
+            logging.info("ℹ️ Chưa có dữ liệu lần trước, thu thập toàn bộ")
+        else:
+            logging.info("♻️ Chế độ tăng dần đã bật, sử dụng all.json lần trước làm dữ liệu nền")
+
+    owns_parse_pool = parse_pool is None
+    if owns_parse_pool:
+        parse_pool = create_parse_pool(parse_conf.get('workers'), LOG_FORMAT)
 
     logging.info(f"📥 Đang lấy dữ liệu từ {json_url}, mỗi blog lấy {article_count} bài viết")
-    result, lost_friends = fetch_and_process_data(
-        json_url=json_url,
-        specific_RSS=specific_rss,
-        count=article_count
-    ) # type: ignore
+    try:
+        fetched = fetch_and_process_data(
+            json_url=json_url,
+            specific_RSS=specific_rss,
+            count=article_count,
+            cache_dir=cache_dir,
+            discovery_ttl=cache_conf.get('discovery_ttl', 72),
+            max_workers=crawl_conf.get('max_workers', 10),
+            max_per_host=crawl_conf.get('max_per_host', 4),
+            lean=parse_conf.get('lean', False),
+            max_bytes=parse_conf.get('max_feed_bytes'),
+            baseline=baseline,
+            recrawl_interval=incremental_conf.get('recrawl_interval', 24),
+            session=session,
+            scheduler=scheduler,
+            health=health,
+            probe_timeout=health_conf.get('probe_timeout', 5),
+            probe_workers=health_conf.get('probe_workers', 4),
+            time_budget=crawl_conf.get('time_budget'),
+            telemetry=telemetry,
+            parse_pool=parse_pool,
+            # Feed của blog chính luôn được phân tích đầy đủ để rss_subscribe dùng lại kèm summary
+            full_feeds=[config["rss_subscribe"]["your_blog_url"]] if config["rss_subscribe"]["enable"] else None
+        )
+    finally:
+        if owns_parse_pool and parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+    if fetched is None:
+        logging.error("❌ Không lấy được danh sách bạn bè, bỏ qua lần thu thập này")
+        return None
+    result, lost_friends = fetched
+
+    if telemetry is not None:
+        telemetry.save("./crawl_stats.json")
+        summary = telemetry.summary()
+        logging.info(f"📊 Số liệu thu thập đã ghi vào crawl_stats.json: {summary['requests']} request, "
+                     f"{summary['bytes']} byte, {summary['duration']:.1f} giây")
 
     if config["spider_settings"]["merge_result"]["enable"]:
         merge_url = config['spider_settings']["merge_result"]['merge_json_url']
-        logging.info(f"🔀 Tính năng merge đã bật, lấy dữ liệu từ {merge_url}")
+        merge_urls = [merge_url] if isinstance(merge_url, str) else merge_url
+        logging.info(f"🔀 Tính năng merge đã bật, lấy dữ liệu từ {', '.join(merge_urls)}")
 
-        result = marge_data_from_json_url(result, f"{merge_url}/all.json")
-        lost_friends = marge_errors_from_json_url(lost_friends, f"{merge_url}/errors.json")
+        # Cache riêng (namespace merge) để tải có điều kiện, nguồn không thay đổi chỉ tốn một phản hồi 304
+        merge_cache = FeedCache(cache_dir, namespace='merge') if cache_dir else None
+        result = marge_data_from_json_url(result, [f"{url.rstrip('/')}/all.json" for url in merge_urls],
+                                          session=session, cache=merge_cache)
+        lost_friends = marge_errors_from_json_url(lost_friends, [f"{url.rstrip('/')}/errors.json" for url in merge_urls],
+                                                  session=session, cache=merge_cache)
+        if merge_cache is not None:
+            merge_cache.save()
 
     article_count = len(result.get("article_data", []))
     logging.info(f"📦 Đã lấy xong dữ liệu, có {article_count} bạn bè có hoạt động, đang xử lý dữ liệu")
 
-    result = deal_with_large_data(result)
+    store_conf = config['spider_settings'].get('article_store', {})
+    if store_conf.get('enable'):
+        store_path = store_conf.get('path', './cache/articles.db')
+        logging.info(f"🗄️ Kho bài viết SQLite đã bật, ghi vào {store_path}")
+        result = store_crawl_result(store_path, result)
 
-    with open("all.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    retention_conf = config['spider_settings'].get('retention', {})
+    # Kho bài viết xuất ra toàn bộ lịch sử: bài viết cũ của tác giả chỉ phục vụ qua kho và server.py,
+    # all.json chỉ giữ các bài viết mới nhất để không phình ra sau mỗi lần chạy
+    keep_author_history = retention_conf.get('keep_author_history', True) and not store_conf.get('enable')
+    result = deal_with_large_data(
+        result,
+        max_articles=retention_conf.get('max_articles', 150),
+        per_author=retention_conf.get('per_author'),
+        window_days=retention_conf.get('window_days'),
+        keep_author_history=keep_author_history
+    )
+    result = strip_internal_fields(result)
 
-    with open("errors.json", "w", encoding="utf-8") as f:
-        json.dump(lost_friends, f, ensure_ascii=False, indent=2)
+    output_conf = config['spider_settings'].get('output', {})
+    write_output(
+        result,
+        lost_friends,
+        minify=output_conf.get('minify', False),
+        compress=output_conf.get('compress', False),
+        page_size=output_conf.get('page_size', 0),
+        pages_dir=output_conf.get('pages_dir', 'articles'),
+        latest_count=output_conf.get('latest_count', 0)
+    )
 
-# ========== Chuẩn bị gửi email ==========
-SMTP_isReady = False
+    return result, lost_friends
 
-sender_email = ""
-server = ""
-port = 0
-use_tls = False
-password = ""
+# ========== Chuẩn bị gửi email ==========
+def prepare_smtp(config):
+    """
+    Đọc cấu hình SMTP và mật khẩu từ biến môi trường SMTP_PWD.
 
-if config["email_push"]["enable"] or config["rss_subscribe"]["enable"]:
+    Trả về:
+    dict | None: Thông tin SMTP, None nếu chưa thiết lập đủ.
+    """
     logging.info("📨 Tính năng push đã được kích hoạt, đang chuẩn bị...")
 
     smtp_conf = config["smtp"]
@@ -80,17 +200,106 @@ if config["email_push"]["enable"] or config["rss_subscribe"]["enable"]:
     logging.info(f"📡 SMTP server: {server}:{port}")
     if not password or not sender_email or not server or not port:
         logging.error("❌ Biến môi trường SMTP_PWD chưa được thiết lập, không thể gửi email")
-    else:
-        logging.info(f"🔐 Mật khẩu(phần): {password[:3]}*****")
-        SMTP_isReady = True
+        return None
+    logging.info(f"🔐 Mật khẩu(phần): {password[:3]}*****")
+    return {
+        "sender_email": sender_email,
+        "server": server,
+        "port": port,
+        "use_tls": use_tls,
+        "password": password,
+        "pool_size": smtp_conf.get("pool_size", 3),
+        "rate_limit": smtp_conf.get("rate_limit"),
+        "max_retries": smtp_conf.get("max_retries", 3)
+    }
+
+# ========== Gửi bản tin email ==========
+def _digest_candidates(config, index, result=None):
+    """
+    Lấy các bài viết có thể vào bản tin: từ kho SQLite (truy vấn theo chỉ mục thời gian, chỉ đọc cửa sổ
+    của chỉ mục bản tin) nếu đã bật, nếu không thì từ kết quả thu thập lần này hoặc all.json.
+    """
+    store_conf = config['spider_settings'].get('article_store', {})
+    store_path = store_conf.get('path', './cache/articles.db')
+    if store_conf.get('enable') and os.path.exists(store_path):
+        with ArticleStore(store_path, readonly=True) as store:
+            return store.query_articles(since=index.since())
+    if result is None:
+        if not os.path.exists("./all.json"):
+            return []
+        with open("./all.json", "r", encoding="utf-8") as f:
+            result = json.load(f)
+    return result.get("article_data", [])
 
-# ========== Gửi email (chưa triển khai) ==========
-if config["email_push"]["enable"] and SMTP_isReady:
+def run_email_push(config, smtp, result=None):
+    """
+    Gửi một bản tin tổng hợp các bài viết mới kể từ lần gửi trước tới email_push.to_email.
+
+    Bài viết mới được xác định bằng chỉ mục băm liên kết lưu trong email_push.index_path (xem DigestIndex),
+    không so sánh toàn bộ all.json giữa hai lần chạy. Chỉ ghi nhận là đã gửi khi gửi thành công,
+    lần gửi thất bại sẽ được thử lại ở lần chạy sau.
+
+    Tham số:
+    config (dict): Cấu hình đã tải từ conf.yaml.
+    smtp (dict): Thông tin SMTP từ prepare_smtp.
+    result (dict): Kết quả thu thập lần này; None thì đọc all.json.
+    """
     logging.info("📧 Gửi email đã được kích hoạt")
-    logging.info("⚠️ Xin lỗi, tính năng gửi email hiện chưa được triển khai")
+
+    email_conf = config["email_push"]
+    index = DigestIndex(
+        email_conf.get("index_path", "./cache/digest.json"),
+        lookback_days=email_conf.get("lookback_days", 7)
+    )
+    if not index.is_due(email_conf.get("interval", 24)):
+        logging.info("⏳ Chưa đến lúc gửi bản tin tiếp theo, bỏ qua")
+        return
+
+    articles = index.new_articles(_digest_candidates(config, index, result))
+    if not articles:
+        logging.info("📭 Không có bài viết mới kể từ bản tin trước, không cần gửi")
+        return
+
+    max_articles = email_conf.get("max_articles", 50)
+    listed = articles[:max_articles]
+    subject = email_conf.get("subject", "今天的 RSS 订阅更新")
+    template_data = {
+        "subject": subject,
+        "articles": listed,
+        "total": len(articles),
+        "more": len(articles) - len(listed),
+        "site_url": email_conf.get("site_url", ""),
+        "date": time.strftime("%Y-%m-%d"),
+    }
+    body = "\n".join(
+        f"📄 {article['title']} - {article['author']} ({article['created']})\n🔗 {article['link']}"
+        for article in listed
+    )
+
+    to_email = email_conf["to_email"]
+    logging.info(f"📰 Có {len(articles)} bài viết mới, đang gửi bản tin tới {to_email}")
+    results = send_emails(
+        emails=to_email if isinstance(to_email, list) else [to_email],
+        sender_email=smtp["sender_email"],
+        smtp_server=smtp["server"],
+        port=smtp["port"],
+        password=smtp["password"],
+        subject=subject,
+        body=body,
+        template_path=email_conf.get("body_template"),
+        template_data=template_data,
+        use_tls=smtp["use_tls"],
+        pool_size=1,
+        max_retries=smtp["max_retries"]
+    )
+    if results and all(item["ok"] for item in results):
+        index.mark_sent(articles)
+        logging.info(f"✅ Đã gửi bản tin, chỉ mục hiện có {len(index)} bài viết")
+    else:
+        logging.warning("❌ Gửi bản tin thất bại, các bài viết sẽ được gửi lại ở lần chạy sau")
 
 # ========== Push RSS subscription ==========
-if config["rss_subscribe"]["enable"] and SMTP_isReady:
+def run_rss_subscribe(config, smtp):
     logging.info("📰 Push RSS subscription đã được kích hoạt")
 
     # Lấy thông tin GitHub repository
@@ -105,60 +314,153 @@ if config["rss_subscribe"]["enable"] and SMTP_isReady:
     logging.info(f"📁 GitHub repository: {github_repo}")
 
     your_blog_url = config["rss_subscribe"]["your_blog_url"]
-    email_template = config["rss_subscribe"]["email_template"]
-    website_title = config["rss_subscribe"]["website_info"]["title"]
 
+    # Nếu blog của bạn nằm trong danh sách bạn bè vừa thu thập thì dùng lại kết quả, không tải lại feed
+    cache_conf = config['spider_settings'].get('cache', {})
     latest_articles = get_latest_articles_from_link(
         url=your_blog_url,
         count=5,
-        last_articles_path="./rss_subscribe/last_articles.json" # Lưu bài viết lần trước
+        last_articles_path="./rss_subscribe/last_articles.json", # Lưu bài viết lần trước
+        cache_dir=cache_conf.get('cache_dir', './cache') if cache_conf.get('enable') else None
     )
 
     if not latest_articles:
         logging.info("📭 Không có bài viết mới, không cần push")
-    else:
-        logging.info(f"🆕 Bài viết mới nhất nhận được: {latest_articles}")
+        return
 
-        github_api_url = (
-            f"https://api.github.com/repos/{github_username}/{github_repo}/issues"
-            f"?state=closed&label=subscribed&per_page=200"
-        )
-        logging.info(f"🔎 Đang lấy email subscription từ GitHub: {github_api_url}")
-        email_list = extract_emails_from_issues(github_api_url)
+    logging.info(f"🆕 Bài viết mới nhất nhận được: {latest_articles}")
+
+    github_api_url = f"https://api.github.com/repos/{github_username}/{github_repo}/issues"
+    logging.info(f"🔎 Đang lấy email subscription từ GitHub: {github_api_url}")
+    email_list = extract_emails_from_issues(
+        github_api_url,
+        token=os.getenv("GITHUB_TOKEN"),
+        state_path=config["rss_subscribe"].get("subscribers_path", "./cache/subscribers.json")
+    )
 
-        if not email_list:
-            logging.info("⚠️ Không có email subscription, vui lòng kiểm tra định dạng hoặc có người subscribe không")
-            sys.exit(0)
+    if not email_list:
+        logging.info("⚠️ Không có email subscription, vui lòng kiểm tra định dạng hoặc có người subscribe không")
+        return
 
-        logging.info(f"📬 Nhận được danh sách email: {email_list}")
+    logging.info(f"📬 Nhận được danh sách email: {email_list}")
 
+    # Một engine gửi dùng chung cho mọi bài viết, giữ kết nối SMTP đã đăng nhập giữa các lần gửi
+    with SMTPPool(
+        smtp["server"], smtp["port"], smtp["sender_email"], smtp["password"], smtp["use_tls"],
+        pool_size=smtp["pool_size"], rate_limit=smtp["rate_limit"], max_retries=smtp["max_retries"]
+    ) as pool:
+        results = []
         for article in latest_articles:
-            template_data = {
-                "title": article["title"],
-                "summary": article["summary"],
-                "published": article["published"],
-                "link": article["link"],
-                "website_title": website_title,
-                "github_issue_url": (
-                    f"https://github.com/{github_username}/{github_repo}"
-                    "/issues?q=is%3Aissue+is%3Aclosed"
-                ),
-            }
-
-            send_emails(
-                emails=email_list["emails"],
-                sender_email=sender_email,
-                smtp_server=server,
-                port=port,
-                password=password,
-                subject=f"{website_title} のBài viết mới nhất: {article['title']}",
-                body=(
-                    f"📄 Tiêu đề bài viết: {article['title']}\n"
-                    f"🔗 Liên kết: {article['link']}\n"
-                    f"📝 Giới thiệu: {article['summary']}\n"
-                    f"🕒 Thời gian xuất bản: {article['published']}"
-                ),
-                template_path=email_template,
-                template_data=template_data,
-                use_tls=use_tls
-            )
+            results.extend(_send_article(config, smtp, pool, article, email_list["emails"],
+                                         github_username, github_repo))
+
+    failed = [result for result in results if not result["ok"]]
+    logging.info(f"📮 Đã gửi {len(results) - len(failed)}/{len(results)} email")
+    for result in failed:
+        logging.warning(f"❌ Gửi thất bại tới {result['email']} ({result['subject']}): {result['error']}")
+
+def _send_article(config, smtp, pool, article, emails, github_username, github_repo):
+    """
+    Gửi thông báo một bài viết mới tới toàn bộ người đăng ký qua engine gửi dùng chung.
+
+    Trả về:
+    list: Kết quả gửi của từng người nhận.
+    """
+    email_template = config["rss_subscribe"]["email_template"]
+    website_title = config["rss_subscribe"]["website_info"]["title"]
+    template_data = {
+        "title": article["title"],
+        "summary": article["summary"],
+        "published": article["published"],
+        "link": article["link"],
+        "website_title": website_title,
+        "github_issue_url": (
+            f"https://github.com/{github_username}/{github_repo}"
+            "/issues?q=is%3Aissue+is%3Aclosed"
+        ),
+    }
+
+    return send_emails(
+        emails=emails,
+        sender_email=smtp["sender_email"],
+        smtp_server=smtp["server"],
+        port=smtp["port"],
+        password=smtp["password"],
+        subject=f"{website_title} のBài viết mới nhất: {article['title']}",
+        body=(
+            f"📄 Tiêu đề bài viết: {article['title']}\n"
+            f"🔗 Liên kết: {article['link']}\n"
+            f"📝 Giới thiệu: {article['summary']}\n"
+            f"🕒 Thời gian xuất bản: {article['published']}"
+        ),
+        template_path=email_template,
+        template_data=template_data,
+        use_tls=smtp["use_tls"],
+        pool=pool
+    )
+
+def run_push(config, result=None):
+    if not (config["email_push"]["enable"] or config["rss_subscribe"]["enable"]):
+        return
+    smtp = prepare_smtp(config)
+    if smtp is None:
+        return
+    if config["email_push"]["enable"]:
+        run_email_push(config, smtp, result)
+    if config["rss_subscribe"]["enable"]:
+        run_rss_subscribe(config, smtp)
+
+# ========== Chế độ daemon ==========
+def run_daemon(config):
+    """
+    Chạy liên tục: mỗi chu kỳ chỉ thu thập các feed đã đến hạn theo lịch thích ứng, dùng lại session
+    (giữ kết nối) và dữ liệu của chu kỳ trước, rồi ngủ tới khi feed gần nhất đến hạn.
+    """
+    daemon_conf = config['spider_settings'].get('daemon', {})
+    cache_conf = config['spider_settings'].get('cache', {})
+    crawl_conf = config['spider_settings'].get('crawl', {})
+    scheduler = FeedScheduler(
+        cache_dir=cache_conf.get('cache_dir', './cache') if cache_conf.get('enable') else None,
+        min_interval=daemon_conf.get('min_interval', 1),
+        max_interval=daemon_conf.get('max_interval', 72),
+        default_interval=daemon_conf.get('default_interval', 12)
+    )
+    min_sleep = daemon_conf.get('min_sleep', 60)
+    max_sleep = daemon_conf.get('max_sleep', 3600)
+    session = create_session(crawl_conf.get('max_workers', 10))
+    health = create_health_store(config)
+    parse_pool = create_parse_pool(config['spider_settings'].get('parse', {}).get('workers'), LOG_FORMAT)
+    baseline = None
+
+    logging.info("🔁 Chế độ daemon đã được kích hoạt")
+    while True:
+        if config["spider_settings"]["enable"]:
+            written = run_spider(config, session=session, scheduler=scheduler, baseline=baseline, health=health,
+                                 parse_pool=parse_pool)
+            if written is not None:
+                baseline = written
+        run_push(config, baseline[0] if baseline is not None else None)
+
+        next_wakeup = scheduler.next_wakeup()
+        delay = max_sleep if next_wakeup is None else next_wakeup - time.time()
+        delay = max(min_sleep, min(max_sleep, delay))
+        logging.info(f"💤 Chu kỳ kết thúc, chu kỳ tiếp theo sau {int(delay)} giây")
+        time.sleep(delay)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Friend Circle Lite")
+    arg_parser.add_argument("--daemon", action="store_true", help="Chạy liên tục với lịch thu thập thích ứng cho từng feed")
+    args = arg_parser.parse_args()
+
+    # ========== Tải cấu hình ==========
+    config = load_config("./conf.yaml")
+
+    if args.daemon or config['spider_settings'].get('daemon', {}).get('enable'):
+        run_daemon(config)
+        return
+
+    written = run_spider(config) if config["spider_settings"]["enable"] else None
+    run_push(config, written[0] if written is not None else None)
+
+if __name__ == '__main__':
+    main()
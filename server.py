@@ -1,15 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from starlette.middleware.cors import CORSMiddleware
+from bisect import bisect_right
+from collections import namedtuple
+import gzip
+import hashlib
 import json
+import os
 import random
+import sqlite3
 
-from friend_circle_lite.get_info import fetch_and_process_data, sort_articles_by_time
+from friend_circle_lite.get_info import fetch_and_process_data, sort_articles_by_time, article_timestamp, created_timestamp, parse_timestamp
 from friend_circle_lite.get_conf import load_config
+from friend_circle_lite.article_store import ArticleStore
 
 app = FastAPI()
 
+# 若启用了 SQLite 文章库，则随机文章等接口直接从文章库查询
+config = load_config("./conf.yaml")
+store_conf = config.get("spider_settings", {}).get("article_store", {})
+ARTICLE_STORE_PATH = store_conf.get("path", "./cache/articles.db") if store_conf.get("enable") else None
+
 # 设置静态文件目录
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/main", StaticFiles(directory="main"), name="main")
@@ -52,23 +64,70 @@ async def get_fclite_js():
 async def root():
     return FileResponse('./static/index.html')
 
+# 数据文件的内存缓存：保存解析后的数据以及预先编码、预先压缩的响应体
+JsonSnapshot = namedtuple("JsonSnapshot", ["data", "body", "gzip_body", "etag"])
+
+class JsonFileCache:
+    """
+    缓存 JSON 数据文件，文件的 mtime 或大小变化时才重新读取。
+
+    每次加载时预先生成紧凑编码的响应体、gzip 压缩后的响应体和强 ETag，
+    之后的请求只需检查一次文件状态即可直接返回内存中的字节。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stat_key = None
+        self._snapshot = None
+
+    def get(self):
+        """
+        返回最新的 JsonSnapshot，文件不存在时抛出 FileNotFoundError，解析失败时抛出 json.JSONDecodeError。
+        """
+        stat = os.stat(self.path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key != self._stat_key:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            self._snapshot = JsonSnapshot(data, body, gzip.compress(body, compresslevel=6), etag)
+            self._stat_key = stat_key
+        return self._snapshot
+
+all_json_cache = JsonFileCache('./all.json')
+errors_json_cache = JsonFileCache('./errors.json')
+
+def cached_json_response(request: Request, snapshot: JsonSnapshot):
+    """
+    根据请求头返回缓存的数据：If-None-Match 命中时返回 304，客户端支持 gzip 时返回预压缩的响应体。
+    """
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    # gzip 与未压缩的响应体字节不同，强 ETag 需要区分
+    etag = snapshot.etag[:-1] + '-gzip"' if use_gzip else snapshot.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
 @app.get('/all.json')
-async def get_all_articles():
+async def get_all_articles(request: Request):
     try:
-        with open('./all.json', 'r', encoding='utf-8') as f:
-            articles_data = json.load(f)
-        return JSONResponse(content=articles_data)
+        return cached_json_response(request, all_json_cache.get())
     except FileNotFoundError:
         return JSONResponse(content={"error": "File not found"}, status_code=404)
     except json.JSONDecodeError:
         return JSONResponse(content={"error": "Failed to decode JSON"}, status_code=500)
 
 @app.get('/errors.json')
-async def get_error_friends():
+async def get_error_friends(request: Request):
     try:
-        with open('./errors.json', 'r', encoding='utf-8') as f:
-            errors_data = json.load(f)
-        return JSONResponse(content=errors_data)
+        return cached_json_response(request, errors_json_cache.get())
     except FileNotFoundError:
         return JSONResponse(content={"error": "File not found"}, status_code=404)
     except json.JSONDecodeError:
@@ -76,9 +135,18 @@ async def get_error_friends():
 
 @app.get('/random')
 async def get_random_article():
+    if ARTICLE_STORE_PATH and os.path.exists(ARTICLE_STORE_PATH):
+        try:
+            with ArticleStore(ARTICLE_STORE_PATH, readonly=True) as store:
+                random_article = store.random_article()
+        except sqlite3.Error:
+            return JSONResponse(content={"error": "Failed to query article store"}, status_code=500)
+        if random_article:
+            random_article.pop("timestamp", None)
+            return JSONResponse(content=random_article)
+        return JSONResponse(content={"error": "No articles available"}, status_code=404)
     try:
-        with open('./all.json', 'r', encoding='utf-8') as f:
-            articles_data = json.load(f)
+        articles_data = all_json_cache.get().data
         if articles_data.get("article_data"):
             random_article = random.choice(articles_data["article_data"])
             return JSONResponse(content=random_article)
@@ -89,6 +157,205 @@ async def get_random_article():
     except json.JSONDecodeError:
         return JSONResponse(content={"error": "Failed to decode JSON"}, status_code=500)
 
+class ArticleIndex:
+    """
+    all.json 的文章索引，在数据加载时一次性构建，分页和筛选请求只需二分查找与切片。
+
+    - 所有文章按时间倒序排列，并保存对应的时间戳，since 筛选即为前缀长度的二分查找
+    - 按作者分组保存文章与时间戳，作者筛选无需扫描全部文章
+    - 预先生成每位作者的摘要信息
+    """
+
+    def __init__(self, data):
+        self.statistical_data = data.get("statistical_data", {})
+        self.articles = sorted(
+            ({k: v for k, v in article.items() if k != "timestamp"} for article in data.get("article_data", [])),
+            key=article_timestamp,
+            reverse=True
+        )
+        # 使用负时间戳，使列表升序，便于 bisect
+        self.neg_times = [-article_timestamp(article) for article in self.articles]
+        self.by_author = {}
+        for article, neg_time in zip(self.articles, self.neg_times):
+            articles, neg_times = self.by_author.setdefault(article.get("author", ""), ([], []))
+            articles.append(article)
+            neg_times.append(neg_time)
+        self.authors = [
+            {
+                "author": author,
+                "avatar": articles[0].get("avatar", ""),
+                "article_num": len(articles),
+                "latest_title": articles[0].get("title", ""),
+                "latest_link": articles[0].get("link", ""),
+                "latest_created": articles[0].get("created", "")
+            }
+            for author, (articles, _) in self.by_author.items()
+        ]
+
+    def query(self, offset, size, author=None, since=None):
+        """
+        返回 (符合条件的文章总数, 当前页文章列表)。
+        """
+        if author is not None:
+            articles, neg_times = self.by_author.get(author, ([], []))
+        else:
+            articles, neg_times = self.articles, self.neg_times
+        total = len(articles) if since is None else bisect_right(neg_times, -since)
+        return total, articles[offset:min(offset + size, total)]
+
+_article_index = None
+_article_index_etag = None
+
+def get_article_index():
+    """
+    获取与当前 all.json 对应的文章索引，文件变化时重新构建。
+    """
+    global _article_index, _article_index_etag
+    snapshot = all_json_cache.get()
+    if snapshot.etag != _article_index_etag:
+        _article_index = ArticleIndex(snapshot.data)
+        _article_index_etag = snapshot.etag
+    return _article_index
+
+def parse_since(since):
+    """
+    解析 since 参数，支持时间戳（秒）、与 all.json 相同时区的 YYYY-MM-DD[ HH:MM]，以及其他带时区的常见时间格式。
+    无法解析时返回 None。
+    """
+    if not since:
+        return None
+    if since.isdigit():
+        return int(since)
+    timestamp = created_timestamp(since) or created_timestamp(since + " 00:00")
+    return timestamp if timestamp is not None else parse_timestamp(since)
+
+@app.get('/articles')
+async def get_articles(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    author: str = None,
+    since: str = None
+):
+    since_timestamp = parse_since(since)
+    if since and since_timestamp is None:
+        return JSONResponse(content={"error": "Invalid since parameter"}, status_code=400)
+    offset = (page - 1) * size
+
+    if ARTICLE_STORE_PATH and os.path.exists(ARTICLE_STORE_PATH):
+        try:
+            with ArticleStore(ARTICLE_STORE_PATH, readonly=True) as store:
+                total = store.count_articles(author, since_timestamp)
+                article_data = store.query_articles(size, offset, author, since_timestamp)
+                statistical_data = store.get_meta("statistical_data", {})
+        except sqlite3.Error:
+            return JSONResponse(content={"error": "Failed to query article store"}, status_code=500)
+        for article in article_data:
+            article.pop("timestamp", None)
+    else:
+        try:
+            index = get_article_index()
+        except FileNotFoundError:
+            return JSONResponse(content={"error": "File not found"}, status_code=404)
+        except json.JSONDecodeError:
+            return JSONResponse(content={"error": "Failed to decode JSON"}, status_code=500)
+        total, article_data = index.query(offset, size, author, since_timestamp)
+        statistical_data = index.statistical_data
+
+    return JSONResponse(content={
+        "statistical_data": statistical_data,
+        "page": page,
+        "size": size,
+        "total": total,
+        "article_data": article_data
+    })
+
+@app.get('/authors')
+async def get_authors():
+    if ARTICLE_STORE_PATH and os.path.exists(ARTICLE_STORE_PATH):
+        try:
+            with ArticleStore(ARTICLE_STORE_PATH, readonly=True) as store:
+                return JSONResponse(content=store.author_summaries())
+        except sqlite3.Error:
+            return JSONResponse(content={"error": "Failed to query article store"}, status_code=500)
+    try:
+        return JSONResponse(content=get_article_index().authors)
+    except FileNotFoundError:
+        return JSONResponse(content={"error": "File not found"}, status_code=404)
+    except json.JSONDecodeError:
+        return JSONResponse(content={"error": "Failed to decode JSON"}, status_code=500)
+
+crawl_stats_cache = JsonFileCache('./crawl_stats.json')
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_metrics(crawl_stats, statistical_data):
+    """
+    将 crawl_stats.json 与 all.json 的统计信息转换为 Prometheus 文本格式。
+    """
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{key}="{prometheus_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    summary = crawl_stats.get("summary", {})
+    friends = crawl_stats.get("friends", [])
+    metric("fcl_crawl_duration_seconds", "gauge", "Wall time of the last crawl.",
+           [({}, summary.get("duration"))])
+    metric("fcl_crawl_friends", "gauge", "Friends processed in the last crawl by status.",
+           [({"status": status}, count) for status, count in summary.get("statuses", {}).items()])
+    metric("fcl_crawl_requests", "gauge", "HTTP requests sent in the last crawl.",
+           [({}, summary.get("requests"))])
+    metric("fcl_crawl_bytes", "gauge", "Feed bytes downloaded in the last crawl.",
+           [({}, summary.get("bytes"))])
+    metric("fcl_crawl_articles", "gauge", "Articles parsed in the last crawl.",
+           [({}, summary.get("articles"))])
+    metric("fcl_crawl_latency_seconds", "gauge", "Per-friend latency quantiles of the last crawl by phase.",
+           [({"phase": phase, "quantile": quantile}, values.get(key))
+            for phase, values in summary.get("latency", {}).items()
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"))])
+    metric("fcl_crawl_slowest_host_seconds", "gauge", "Total time of the slowest hosts in the last crawl.",
+           [({"host": entry["host"], "status": entry["status"]}, entry["total"])
+            for entry in summary.get("slowest_hosts", [])])
+
+    for field, name, help_text in (
+        ("total", "fcl_friend_total_seconds", "Total time spent on a friend."),
+        ("connect", "fcl_friend_connect_seconds", "Connection setup time (DNS, TCP and TLS) for a friend."),
+        ("ttfb", "fcl_friend_ttfb_seconds", "Time to first byte of the feed request for a friend."),
+        ("parse", "fcl_friend_parse_seconds", "Feed parse time for a friend."),
+        ("bytes", "fcl_friend_bytes", "Feed bytes downloaded for a friend."),
+        ("attempts", "fcl_friend_requests", "Discovery and feed requests sent for a friend."),
+        ("articles", "fcl_friend_articles", "Articles parsed for a friend."),
+        ("http_status", "fcl_friend_http_status", "Last HTTP status code seen for a friend."),
+    ):
+        metric(name, "gauge", help_text,
+               [({"name": entry["name"], "host": entry["host"], "status": entry["status"]}, entry.get(field))
+                for entry in friends])
+
+    for key in ("friends_num", "active_num", "error_num", "article_num", "unfinished_num"):
+        if key in statistical_data:
+            metric(f"fcl_{key}", "gauge", f"{key} of all.json statistical_data.", [({}, statistical_data[key])])
+    return "\n".join(lines) + "\n"
+
+@app.get('/metrics')
+async def get_metrics():
+    try:
+        crawl_stats = crawl_stats_cache.get().data
+    except (FileNotFoundError, json.JSONDecodeError):
+        crawl_stats = {}
+    try:
+        statistical_data = all_json_cache.get().data.get("statistical_data", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        statistical_data = {}
+    return Response(content=render_metrics(crawl_stats, statistical_data),
+                    media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == '__main__':
     # 启动FastAPI应用
     import uvicorn
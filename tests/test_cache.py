@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from friend_circle_lite import get_info
+from friend_circle_lite.cache import FeedCache
+
+
+def _response(etag):
+    return SimpleNamespace(headers={'ETag': etag})
+
+
+def test_store_drops_article_content(tmp_path):
+    cache = FeedCache(str(tmp_path))
+    result = {'articles': [{'title': 'a', 'summary': 's', 'content': 'x' * 1000}]}
+    cache.store('https://a.example/feed', _response('"1"'), result, 'sig')
+    cache.save()
+
+    cached = FeedCache(str(tmp_path)).cached_result('https://a.example/feed', 'sig')
+    assert cached == {'articles': [{'title': 'a', 'summary': 's'}]}
+    assert 'content' in result['articles'][0]
+
+
+def test_save_prunes_entries_not_used_this_run(tmp_path):
+    cache = FeedCache(str(tmp_path))
+    for blog in ('https://old.example/', 'https://idle.example/', 'https://live.example/'):
+        cache.store_discovery(blog, 'atom', blog + 'atom.xml')
+        cache.store(blog + 'atom.xml', _response('"1"'), {'articles': []}, 'sig')
+    cache.save()
+
+    cache = FeedCache(str(tmp_path))
+    cache.cached_result('https://live.example/atom.xml', 'sig')
+    cache.save([{'link': 'https://idle.example/'}, {'link': 'https://live.example/'}])
+
+    cache = FeedCache(str(tmp_path))
+    assert cache.discovered_feed('https://old.example/') is None
+    assert cache.cached_result('https://old.example/atom.xml', 'sig') is None
+    # Bạn bè chưa đến lượt thu thập vẫn giữ kết quả dò feed và validator
+    assert cache.discovered_feed('https://idle.example/') == ['atom', 'https://idle.example/atom.xml']
+    assert cache.cached_result('https://idle.example/atom.xml', 'sig') == {'articles': []}
+    assert cache.cached_result('https://live.example/atom.xml', 'sig') == {'articles': []}
+
+
+def test_namespaces_do_not_prune_each_other(tmp_path):
+    crawl = FeedCache(str(tmp_path))
+    crawl.store('https://a.example/feed', _response('"1"'), {'articles': []}, 'sig')
+    crawl.save()
+    merge = FeedCache(str(tmp_path), namespace='merge')
+    merge.store('https://b.example/all.json', _response('"2"'), {'article_data': []}, 'json')
+    merge.save()
+
+    FeedCache(str(tmp_path)).save([])
+
+    assert FeedCache(str(tmp_path), namespace='merge').cached_result('https://b.example/all.json', 'json') == {'article_data': []}
+
+
+def test_configured_rss_bypasses_discovery_cache(tmp_path, monkeypatch):
+    probed = []
+    monkeypatch.setattr(get_info, '_probe_feed', lambda feed_url, *args, **kwargs: probed.append(feed_url) or object())
+    cache = FeedCache(str(tmp_path))
+    cache.store_discovery('https://blog.example', 'atom', 'https://blog.example/atom.xml')
+
+    friend = {'link': 'https://blog.example', 'rss': 'https://blog.example/new-feed.xml'}
+    feed_type, feed_url, _ = get_info.discover_feed(friend, None, cache)
+
+    assert feed_url == 'https://blog.example/new-feed.xml'
+    assert probed == ['https://blog.example/new-feed.xml']
+    assert cache.discovered_feed('https://blog.example') == ['atom', 'https://blog.example/atom.xml']
@@ -0,0 +1,40 @@
+import threading
+import time
+from collections import Counter
+
+from friend_circle_lite.get_info import _crawl_with_threads
+
+
+def test_max_per_host_queues_without_holding_threads():
+    lock = threading.Lock()
+    running = Counter()
+    peak = Counter()
+
+    def worker(friend):
+        host = friend['link']
+        with lock:
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+        time.sleep(0.02)
+        with lock:
+            running[host] -= 1
+        return friend['name']
+
+    friends = [{'name': f'a{i}', 'link': 'https://a.example/'} for i in range(6)]
+    friends += [{'name': f'b{i}', 'link': 'https://b.example/'} for i in range(2)]
+    start = time.monotonic()
+    results = [result for _, result in _crawl_with_threads(friends, worker, max_workers=4, max_per_host=2)]
+
+    assert sorted(results) == sorted(friend['name'] for friend in friends)
+    assert peak['https://a.example/'] == 2 and peak['https://b.example/'] == 2
+    # Bạn bè của a.example xếp hàng ngoài pool, b.example không phải chờ phía sau chúng
+    assert time.monotonic() - start < 0.2
+
+
+def test_deadline_returns_queued_friends_as_unfinished(monkeypatch):
+    monkeypatch.setattr('friend_circle_lite.get_info.CANCEL_GRACE', 0)
+    friends = [{'name': str(i), 'link': 'https://slow.example/'} for i in range(3)]
+    results = list(_crawl_with_threads(friends, lambda friend: time.sleep(0.3), max_workers=3,
+                                       deadline=time.monotonic() + 0.05, max_per_host=1))
+    assert sorted(friend['name'] for friend, _ in results) == ['0', '1', '2']
+    assert all(result is None for _, result in results)
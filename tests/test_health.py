@@ -0,0 +1,16 @@
+from friend_circle_lite.health import HealthStore
+
+
+def test_health_state_persists_without_feed_cache(tmp_path):
+    path = str(tmp_path / 'cache' / 'health.json')
+    friend = {'link': 'https://dead.example/'}
+    store = HealthStore(path, failure_threshold=2)
+    store.record_failure(friend, 'timeout')
+    store.save([friend])
+
+    store = HealthStore(path, failure_threshold=2)
+    assert not store.is_quarantined(friend)
+    store.record_failure(friend, 'timeout')
+    store.save([friend])
+
+    assert HealthStore(path, failure_threshold=2).is_quarantined(friend)
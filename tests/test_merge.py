@@ -0,0 +1,30 @@
+from friend_circle_lite import get_info
+from friend_circle_lite.get_info import marge_data_from_json_url
+
+
+def _article(title, link, created):
+    return {'title': title, 'link': link, 'created': created, 'author': title}
+
+
+def test_merge_dedupes_by_normalized_link(monkeypatch):
+    remote = {'article_data': [
+        _article('remote copy', 'http://example.com/a/', '2024-01-02 00:00'),
+        _article('remote only', 'https://example.com/b', '2024-01-03 00:00'),
+    ]}
+    monkeypatch.setattr(get_info, '_fetch_json', lambda url, session=None, cache=None: remote)
+    data = {'article_data': [_article('local', 'https://example.com/a', '2024-01-02 00:00')]}
+
+    merged = marge_data_from_json_url(data, 'https://remote/all.json')['article_data']
+    assert [article['title'] for article in merged] == ['remote only', 'local']
+
+
+def test_merge_keeps_articles_without_link(monkeypatch):
+    remote = {'article_data': [_article('remote no link', '', '2024-01-01 00:00')]}
+    monkeypatch.setattr(get_info, '_fetch_json', lambda url, session=None, cache=None: remote)
+    data = {'article_data': [
+        _article('first no link', '', '2024-01-03 00:00'),
+        _article('second no link', None, '2024-01-02 00:00'),
+    ]}
+
+    merged = marge_data_from_json_url(data, 'https://remote/all.json')['article_data']
+    assert [article['title'] for article in merged] == ['first no link', 'second no link', 'remote no link']
@@ -0,0 +1,35 @@
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+from friend_circle_lite.get_info import _parse_feed_body
+
+
+def _rss(days):
+    items = ''.join(
+        f'<item><title>D{day}</title><link>https://example.com/{day}</link>'
+        f'<pubDate>{format_datetime(datetime(2024, 1, day, tzinfo=timezone.utc))}</pubDate></item>'
+        for day in days
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Blog</title>'
+            f'<link>https://example.com/</link>{items}</channel></rss>').encode('utf-8')
+
+
+def _titles(result):
+    return [article['title'] for article in result['articles']]
+
+
+def test_lean_keeps_newer_entry_after_sorted_prefix():
+    body = _rss(list(range(10, 0, -1)) + [20])
+    assert _titles(_parse_feed_body(body, count=5, lean=True)) == ['D20', 'D10', 'D9', 'D8', 'D7']
+
+
+def test_lean_matches_full_parse_on_sorted_feed():
+    body = _rss(range(10, 0, -1))
+    lean = _parse_feed_body(body, count=5, lean=True)
+    full = _parse_feed_body(body, count=5)
+    assert _titles(lean) == _titles(full) == ['D10', 'D9', 'D8', 'D7', 'D6']
+
+
+def test_lean_unsorted_prefix():
+    body = _rss([3, 9, 1, 2, 8, 4])
+    assert _titles(_parse_feed_body(body, count=3, lean=True)) == ['D9', 'D8', 'D4']
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import pytest
+import requests
+
+from friend_circle_lite.cache import feed_registry
+from friend_circle_lite.get_conf import load_config
+from rss_subscribe.push_article_update import extract_emails_from_issues, get_latest_articles_from_link
+from run import run_spider
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'conf.yaml')
+
+FEED = '''<?xml version="1.0"?><rss version="2.0"><channel><title>Owner</title><link>{base}/</link>{items}</channel></rss>'''
+ITEM = ('<item><title>Post {day}</title><link>{base}/posts/{day}</link><description>Summary {day}</description>'
+        '<pubDate>Mon, {day:02d} Jan 2024 00:00:00 GMT</pubDate></item>')
+
+
+@pytest.fixture
+def blog_server():
+    hits = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] += 1
+            base = f'http://{self.headers["Host"]}'
+            if self.path == '/links.json':
+                body = json.dumps({'friends': [{'id_name': 'cf-links', 'link_list': [
+                    {'name': 'Owner', 'link': f'{base}/', 'avatar': ''}
+                ]}]})
+                content_type = 'application/json'
+            elif self.path == '/atom.xml':
+                items = ''.join(ITEM.format(base=base, day=day) for day in range(20, 0, -1))
+                body = FEED.format(base=base, items=items)
+                content_type = 'application/rss+xml'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', hits
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('lean', [None, True])
+def test_rss_subscribe_reuses_crawled_owner_feed(blog_server, tmp_path, monkeypatch, lean):
+    base, hits = blog_server
+    config = load_config(CONF_PATH)
+    monkeypatch.chdir(tmp_path)
+    feed_registry.clear()
+
+    config['spider_settings']['json_url'] = f'{base}/links.json'
+    config['rss_subscribe']['enable'] = True
+    config['rss_subscribe']['your_blog_url'] = f'{base}/'
+    if lean is not None:
+        config['spider_settings'].setdefault('parse', {})['lean'] = lean
+
+    with requests.Session() as session:
+        assert run_spider(config, session=session) is not None
+        feed_hits = hits['/atom.xml']
+        assert feed_hits == 1
+
+        articles = get_latest_articles_from_link(
+            f'{base}/', count=5, last_articles_path=str(tmp_path / 'last_articles.json'), session=session
+        )
+
+    assert hits['/atom.xml'] == feed_hits
+    assert [article['title'] for article in articles] == [f'Post {day}' for day in range(20, 15, -1)]
+    assert all(article['summary'] for article in articles)
+
+
+@pytest.fixture
+def github_server():
+    issues = []
+    log = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = dict(parse_qsl(url.query))
+            items = sorted(issues, key=lambda issue: issue['number'])
+            per_page, page = int(query.get('per_page', 30)), int(query.get('page', 1))
+            pages = max(1, -(-len(items) // per_page))
+            data = json.dumps(items[(page - 1) * per_page:page * per_page]).encode('utf-8')
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            log.append((page, self.headers.get('If-None-Match') == etag))
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            if page < pages:
+                base = f'http://{self.headers["Host"]}{url.path}?'
+                self.send_header('Link', ', '.join([
+                    f'<{base}{urlencode(dict(query, page=page + 1))}>; rel="next"',
+                    f'<{base}{urlencode(dict(query, page=pages))}>; rel="last"'
+                ]))
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/repos/o/r/issues', issues, log
+    server.shutdown()
+    server.server_close()
+
+
+def _issue(number, title, user, subscribed=True):
+    return {
+        'number': number,
+        'title': title,
+        'user': {'login': user},
+        'state': 'closed' if subscribed else 'open',
+        'labels': [{'name': 'subscribed'}] if subscribed else []
+    }
+
+
+def test_deleted_subscribe_issue_takes_effect_next_run(github_server, tmp_path):
+    api_url, issues, log = github_server
+    state_path = str(tmp_path / 'subscribers.json')
+    issues.extend(_issue(number, f'[邮箱订阅]user{number}@example.com', f'user{number}') for number in range(1, 151))
+
+    emails = extract_emails_from_issues(api_url, state_path=state_path)['emails']
+    assert len(emails) == 150
+
+    log.clear()
+    assert len(extract_emails_from_issues(api_url, state_path=state_path)['emails']) == 150
+    assert log and all(not_modified for _, not_modified in log)
+
+    del issues[-1]
+    emails = extract_emails_from_issues(api_url, state_path=state_path)['emails']
+    assert len(emails) == 149 and 'user150@example.com' not in emails
+
+    issues.extend(_issue(number, f'[邮箱订阅]user{number}@example.com', f'user{number}') for number in range(151, 210))
+    assert len(extract_emails_from_issues(api_url, state_path=state_path)['emails']) == 208
+
+
+def test_unsubscribe_only_from_subscriber(github_server, tmp_path):
+    api_url, issues, _ = github_server
+    issues.extend([
+        _issue(1, '[邮箱订阅]a@example.com', 'alice'),
+        _issue(2, '[邮箱订阅]b@example.com', 'bob'),
+        _issue(3, '[取消订阅]a@example.com', 'mallory', subscribed=False),
+        _issue(4, '[取消订阅]B@example.com', 'Bob', subscribed=False),
+    ])
+    assert extract_emails_from_issues(api_url)['emails'] == ['a@example.com']
@@ -0,0 +1,19 @@
+import pytest
+
+from friend_circle_lite.telemetry import _quantile
+
+
+def test_quantile_empty():
+    assert _quantile([], 0.5) is None
+
+
+@pytest.mark.parametrize('n, p50, p95', [
+    (1, 1, 1),
+    (2, 1, 2),
+    (6, 3, 6),
+    (20, 10, 19),
+])
+def test_quantile_nearest_rank(n, p50, p95):
+    values = list(range(n, 0, -1))
+    assert _quantile(values, 0.5) == p50
+    assert _quantile(values, 0.95) == p95